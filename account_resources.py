@@ -0,0 +1,117 @@
+import asyncio
+import logging
+
+from tronpy.exceptions import AddressNotFound
+
+from caching import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Rough on-chain costs, used to decide whether an account can pay before
+# anything is built or signed.
+TRANSFER_BANDWIDTH_BYTES = 300
+SWAP_BANDWIDTH_BYTES = 400
+SWAP_ENERGY = 200_000
+
+# Fallbacks if the chain parameters cannot be read (sun per byte / per energy unit).
+DEFAULT_BANDWIDTH_PRICE = 1000
+DEFAULT_ENERGY_PRICE = 420
+
+
+class AccountResourceCache:
+    """Short-lived cache of an account's free bandwidth, energy and TRX balance.
+
+    Handlers check feasibility from here before building a transaction, so
+    an account that cannot pay never costs a build/sign/broadcast round-trip.
+    Concurrent lookups for one address share a single fetch.
+    """
+
+    def __init__(self, tron, ttl=5.0, cache_size=10_000, chain_parameters_ttl=3600.0):
+        self.tron = tron
+        self.ttl = ttl
+        self.chain_parameters_ttl = chain_parameters_ttl
+        self._cache = TTLCache(maxsize=cache_size, ttl=ttl)
+
+    async def get(self, address):
+        """Return {"bandwidth", "energy", "balance"} for address (balance in sun)."""
+
+        return await self._cache.get_or_load(("account", address), lambda: self._fetch(address))
+
+    def invalidate(self, address):
+        """Forget address, e.g. after it spent resources on a transaction."""
+
+        self._cache.pop(("account", address))
+
+    async def prices(self):
+        """Return (bandwidth_price, energy_price) in sun from the chain parameters."""
+
+        return await self._cache.get_or_load("prices", self._fetch_prices, self.chain_parameters_ttl)
+
+    async def check_transfer(self, address, amount):
+        """Return None if address can send amount sun of TRX, else a reason."""
+
+        resources, (bandwidth_price, _) = await asyncio.gather(self.get(address), self.prices())
+
+        fee = 0
+        if resources["bandwidth"] < TRANSFER_BANDWIDTH_BYTES:
+            fee = TRANSFER_BANDWIDTH_BYTES * bandwidth_price
+
+        if resources["balance"] < amount + fee:
+            return (
+                f"Insufficient balance: {resources['balance'] / 10 ** 6} TRX available, "
+                f"{(amount + fee) / 10 ** 6} TRX needed including fees."
+            )
+        return None
+
+    async def check_swap(self, address, trx_amount=0):
+        """Return None if address can pay for a swap (plus trx_amount sun sold), else a reason."""
+
+        resources, (bandwidth_price, energy_price) = await asyncio.gather(self.get(address), self.prices())
+
+        fee = 0
+        if resources["bandwidth"] < SWAP_BANDWIDTH_BYTES:
+            fee += SWAP_BANDWIDTH_BYTES * bandwidth_price
+        if resources["energy"] < SWAP_ENERGY:
+            fee += (SWAP_ENERGY - resources["energy"]) * energy_price
+
+        if resources["balance"] < trx_amount + fee:
+            return (
+                f"Insufficient TRX for the swap: {resources['balance'] / 10 ** 6} TRX available, "
+                f"about {(trx_amount + fee) / 10 ** 6} TRX needed including energy and bandwidth."
+            )
+        return None
+
+    async def _fetch(self, address):
+        account, resource = await asyncio.gather(
+            self._call(self.tron.get_account, address),
+            self._call(self.tron.get_account_resource, address),
+        )
+
+        return {
+            "bandwidth": (
+                resource.get("freeNetLimit", 0) - resource.get("freeNetUsed", 0)
+                + resource.get("NetLimit", 0) - resource.get("NetUsed", 0)
+            ),
+            "energy": resource.get("EnergyLimit", 0) - resource.get("EnergyUsed", 0),
+            "balance": account.get("balance", 0),
+        }
+
+    async def _fetch_prices(self):
+        try:
+            parameters = {item["key"]: item.get("value", 0) for item in await self.tron.get_chain_parameters()}
+        except Exception as e:
+            logger.warning("Error: '%s' occurred while reading chain parameters.", e)
+            return DEFAULT_BANDWIDTH_PRICE, DEFAULT_ENERGY_PRICE
+
+        return (
+            parameters.get("getTransactionFee", DEFAULT_BANDWIDTH_PRICE),
+            parameters.get("getEnergyFee", DEFAULT_ENERGY_PRICE),
+        )
+
+    @staticmethod
+    async def _call(method, address):
+        # Unactivated accounts have no on-chain record; treat them as empty.
+        try:
+            return await method(address)
+        except AddressNotFound:
+            return {}
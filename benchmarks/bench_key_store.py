@@ -0,0 +1,89 @@
+"""Measure what encrypted key storage adds to the signing path.
+
+Each variant gets a signing key and signs a transaction id:
+
+- plaintext: parse the hex key from the database row, as /transfer used to
+- sealed:    open the envelope (two ChaCha20-Poly1305 decryptions), then parse
+- unlocked:  KeyStore.signing_key() hitting its cache of unlocked keys
+
+Run from the project root:
+
+    python benchmarks/bench_key_store.py
+
+Exits non-zero if a variant's overhead over plaintext exceeds its budget.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tronpy.keys import PrivateKey  # noqa: E402
+
+from key_pool import generate_keypair  # noqa: E402
+from key_store import KeyCipher, KeyStore  # noqa: E402
+from wallet_store import WalletStore  # noqa: E402
+
+# Overhead budgets over the plaintext path, in microseconds per signature.
+SEALED_BUDGET_US = 250.0
+UNLOCKED_BUDGET_US = 25.0
+
+TXID = bytes.fromhex("ab" * 32)
+
+
+def bench_sync(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+async def bench_async(func, number):
+    best = None
+    for _ in range(5):
+        started = time.perf_counter()
+        for _ in range(number):
+            await func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / number * 1e6
+
+
+async def main():
+    cipher = KeyCipher(os.urandom(32))
+    address, private_key, hex_address = generate_keypair()
+    stored = cipher.seal(address, private_key)
+
+    plaintext = bench_sync(lambda: PrivateKey(bytes.fromhex(private_key)).sign_msg_hash(TXID), 500)
+    sealed = bench_sync(lambda: PrivateKey.fromhex(cipher.open(address, stored)).sign_msg_hash(TXID), 500)
+
+    with tempfile.TemporaryDirectory() as directory:
+        wallet_store = WalletStore(os.path.join(directory, "bench.db"), pool_size=1)
+        await wallet_store.open()
+        try:
+            await wallet_store.create_wallet(address, stored, hex_address, 1)
+            key_store = KeyStore(wallet_store, cipher)
+
+            async def unlocked_sign():
+                _address, key = await key_store.signing_key(1)
+                key.sign_msg_hash(TXID)
+
+            unlocked = await bench_async(unlocked_sign, 500)
+            stats = key_store.stats()
+        finally:
+            await wallet_store.close()
+
+    print(f"{'plaintext parse + sign':<28} {plaintext:9.1f} us")
+    print(f"{'sealed open + parse + sign':<28} {sealed:9.1f} us   overhead {sealed - plaintext:8.1f} us"
+          f"   budget {SEALED_BUDGET_US:.0f} us")
+    print(f"{'unlocked cache + sign':<28} {unlocked:9.1f} us   overhead {unlocked - plaintext:8.1f} us"
+          f"   budget {UNLOCKED_BUDGET_US:.0f} us")
+    print(f"unlocked key cache: {stats['hits']} hits, {stats['misses']} misses")
+
+    over = sealed - plaintext > SEALED_BUDGET_US or unlocked - plaintext > UNLOCKED_BUDGET_US
+    return 1 if over else 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,252 @@
+"""Compare the message_templates renderers with the string-concatenation formatting they replaced.
+
+The renderers also HTML-escape every field and split output at 4096
+characters, so some overhead over the legacy code is expected.
+
+Run from the project root:
+
+    python benchmarks/bench_templates.py
+"""
+
+import os
+import sys
+import timeit
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message_templates import render_meme_coin_info, render_wallet_info, render_wallet_transfers_page  # noqa: E402
+
+ADDRESS = "TVrzEkHN8CXkTjBQHwDKWn9bUrAaWCkrev"
+TOKEN = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
+
+
+def sample_meme_coin():
+    return {"trc20_tokens": [{
+        "name": "Sample Meme", "symbol": "smeme", "total_supply": "1000000000",
+        "total_supply_with_decimals": "1000000000000000", "holders_count": 12345,
+        "transfer24h": 678, "issue_time": "2024-01-01 00:00:00", "transfer_num": 987654,
+        "volume24h": 123456.78, "price_trx": 0.0123, "liquidity24h": 4567.8,
+        "liquidity24h_rate": 0.12, "greyTag": "", "redTag": "", "blueTag": "",
+        "icon_url": "https://example.com/icon.png", "token_desc": "A token <for> benchmarks & tests",
+        "home_page": "https://example.com", "publicTag": "", "email": "team@example.com",
+        "git_hub": "https://github.com/example", "white_paper": "https://example.com/wp.pdf",
+        "issue_address": ADDRESS, "justSwapVolume24h": 4321.0, "justSwapVolume24h_rate": 0.05,
+        "social_media_list": [{"name": f"Site{i}", "url": f"[\"https://example.com/{i}\"]"} for i in range(6)],
+        "market_info": {"priceInTrx": 0.0123, "priceInUsd": 0.0015, "liquidity": 98765.4,
+                        "gain": 0.034, "pairUrl": "https://example.com/pair"},
+        "tokenPriceLine": {"data": [{"time": 1700000000 + i * 3600, "priceUsd": 0.0015 + i / 10000}
+                                    for i in range(10)]},
+    }]}
+
+
+def sample_holdings(count=20):
+    return [{
+        "tokenName": f"Token {i}", "tokenAbbr": f"tk{i}", "balance": str(123456789 * (i + 1)),
+        "tokenDecimal": 6, "tokenType": "trc20", "tokenPriceInUsd": 0.1 * (i + 1),
+        "tokenPriceInTrx": 0.8 * (i + 1), "amountInUsd": 12.34 * (i + 1),
+    } for i in range(count)]
+
+
+def sample_transfers(count=30):
+    return {
+        "tokenInfo": {"tokenName": "Tether USD", "tokenAbbr": "USDT", "tokenId": TOKEN, "issuerAddr": ADDRESS},
+        "data": [{
+            "hash": f"{i:064x}", "from": ADDRESS, "to": TOKEN, "amount": str(1000000 * (i + 1)),
+            "decimals": 6, "block_timestamp": 1700000000000 + i * 60000, "final_result": "SUCCESS",
+            "contract_ret": "SUCCESS", "block": 50000000 + i,
+        } for i in range(count)],
+    }
+
+
+# The formatting code below is what the handlers did before message_templates.
+
+def legacy_meme_coin_info(address, data):
+    tokens = data.get('trc20_tokens', [])
+    formatted_message = "🔐 <strong>Meme Coin Info</strong> 🔐\n\n"
+    formatted_message += f"📍 <strong>Address:</strong> \n <a href='https://tronscan.org/#/token20/{address}'>{address}</a>\n"
+
+    for token in tokens:
+        name = token.get('name', 'N/A')
+        symbol = token.get('symbol', 'N/A')
+        total_supply = token.get('total_supply', 'N/A')
+        total_supply_with_decimals = token.get('total_supply_with_decimals', 'N/A')
+        holders_count = token.get('holders_count', 'N/A')
+        transfer_24h = token.get('transfer24h', 'N/A')
+        issue_time = token.get('issue_time', 'N/A')
+        transfer_num = token.get('transfer_num', 'N/A')
+        volume_24h = token.get('volume24h', 'N/A')
+        liquidity_24h = token.get('liquidity24h', 'N/A')
+        liquidity_24h_rate = token.get('liquidity24h_rate', 'N/A')
+        grey_tag = token.get('greyTag', 'N/A')
+        red_tag = token.get('redTag', 'N/A')
+        blue_tag = token.get('blueTag', 'N/A')
+        icon_url = token.get('icon_url', 'N/A')
+        token_desc = token.get('token_desc', 'N/A')
+        home_page = token.get('home_page', 'N/A')
+        social_media_list = token.get('social_media_list', [])
+        public_tag = token.get('publicTag', 'N/A')
+        email = token.get('email', 'N/A')
+        git_hub = token.get('git_hub', 'N/A')
+        white_paper = token.get('white_paper', 'N/A')
+        issue_address = token.get('issue_address', 'N/A')
+        just_swap_volume_24h = token.get('justSwapVolume24h', 'N/A')
+        just_swap_volume_24h_rate = token.get('justSwapVolume24h_rate', 'N/A')
+        price_in_trx = token.get('market_info', {}).get('priceInTrx', 'N/A')
+        price_in_usd = token.get('market_info', {}).get('priceInUsd', 'N/A')
+        liquidity = token.get('market_info', {}).get('liquidity', 'N/A')
+        gain = token.get('market_info', {}).get('gain', 'N/A')
+        pair_url = token.get('market_info', {}).get('pairUrl', 'N/A')
+        token_price_line = token.get('tokenPriceLine', {}).get('data', [])
+
+        formatted_message += f"""
+💰 <strong>Token Name:</strong> {name}
+🔖 <strong>Symbol:</strong> {symbol.upper()}
+
+📈 <strong>Total Supply:</strong> {total_supply} (with decimals: {total_supply_with_decimals})
+
+📝 <strong>Description:</strong> {token_desc}
+
+👥 <strong>Holders Count:</strong> {holders_count}
+
+🔢 <strong>Total Transfers:</strong> {transfer_num}
+🔄 <strong>Transfers in 24h:</strong> {transfer_24h}
+📉 <strong>Volume (24h):</strong> {volume_24h}
+
+💲 <strong>Price:</strong>
+TRX: {price_in_trx}
+USD: {price_in_usd}
+
+💧 <strong>Liquidity:</strong>
+{liquidity}
+24h: ${liquidity_24h}
+24h Rate: ${liquidity_24h_rate}
+
+📊 <strong>JustSwap Volume (24h):</strong> {just_swap_volume_24h}
+Rate: {just_swap_volume_24h_rate * 100}%
+
+🕒 <strong>Issue Date:</strong> {issue_time}
+
+
+🏠 <strong>Home Page:</strong> <a href="{home_page}">{home_page}</a>
+🏷️ <strong>Tags:</strong> {grey_tag},{red_tag},{blue_tag}
+📛 <strong>Public Tag:</strong> {public_tag}
+
+📧 <strong>Email:</strong> {email}
+💻 <strong>GitHub:</strong> {git_hub}
+📄 <strong>White Paper:</strong> {white_paper}
+
+🏠 <strong>Issue Address:</strong> {issue_address}
+
+📈 <strong>Gain:</strong> {gain * 100}%
+🔗 <strong>Pair URL:</strong> <a href="{pair_url}">{pair_url}</a>
+"""
+        if social_media_list:
+            formatted_message += "\n📱 <strong>Social Media Links:</strong>\n"
+            for platform in social_media_list:
+                name = platform.get('name', 'N/A')
+                url = platform.get('url', 'N/A').strip('[]""')
+                formatted_message += f"   • {name}: <a href='{url}'>{url}</a>\n"
+
+        if token_price_line:
+            formatted_message += "\n📊 <strong>Price Over Time (USD):</strong>\n"
+            for price_point in token_price_line[:5]:
+                timestamp = price_point.get('time', 'N/A')
+                price_usd = price_point.get('priceUsd', 'N/A')
+                if timestamp != 'N/A':
+                    formatted_time = datetime.fromtimestamp(int(timestamp), tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+                else:
+                    formatted_time = 'N/A'
+                formatted_message += f"   • {formatted_time}: {price_usd} USD\n"
+
+        formatted_message += f"\n🖼️ <strong>Icon:</strong> <a href='{icon_url}'>View Icon</a>\n"
+
+    return formatted_message
+
+
+def legacy_wallet_info(wallet_address, tokens):
+    formatted_message = f"🔐 <strong>Wallet Info for {wallet_address}</strong> 🔐\n\n"
+    formatted_message += "<strong>Token Holdings:</strong>\n\n"
+    total_value_usd = 0
+    for token in tokens:
+        token_name = token.get('tokenName', 'N/A')
+        token_abbr = token.get('tokenAbbr', 'N/A')
+        balance = float(token.get('balance', 0)) / 10**int(token.get('tokenDecimal', 6))
+        token_type = token.get('tokenType', 'N/A')
+        token_price_usd = token.get('tokenPriceInUsd', 0)
+        token_price_trx = token.get('tokenPriceInTrx', 0)
+        amount_usd = token.get('amountInUsd', 0)
+        total_value_usd += amount_usd
+
+        formatted_message += f"🪙 <strong>{token_name.upper()} ({token_abbr.upper()})</strong>\n"
+        formatted_message += f"   Balance: {balance:,.6f} {token_abbr.upper()}\n"
+        formatted_message += f"   Type: {token_type.upper()}\n"
+        if token_price_usd:
+            formatted_message += f"   Price: ${token_price_usd:.6f} USD / {token_price_trx:.6f} TRX\n"
+        if amount_usd:
+            formatted_message += f"   Value: ${amount_usd:.2f} USD\n"
+        formatted_message += "\n"
+
+    formatted_message += f"💰 <strong>Total Portfolio Value:</strong> ${total_value_usd:.2f} USD\n\n"
+    return formatted_message
+
+
+def legacy_wallet_transfers(wallet_address, data):
+    transactions = data.get('data', [])
+    token_info = data.get('tokenInfo', {})
+
+    formatted_message = f"🔐 <strong>Recent Transactions for {wallet_address}</strong> 🔐\n\n"
+    formatted_message += f"🪙 <strong>Token:</strong> {token_info.get('tokenName', 'N/A')} ({token_info.get('tokenAbbr', 'N/A')})\n"
+    formatted_message += f"📍 <strong>Token Address:</strong> {token_info.get('tokenId', 'N/A')}\n"
+    formatted_message += f"🏭 <strong>Issuer:</strong> {token_info.get('issuerAddr', 'N/A')}\n\n"
+
+    for tx in transactions:
+        tx_hash = tx.get('hash', 'N/A')
+        from_address = tx.get('from', 'N/A')
+        to_address = tx.get('to', 'N/A')
+        amount = float(tx.get('amount', 0)) / 10**int(tx.get('decimals', 18))
+        timestamp = tx.get('block_timestamp', 'N/A')
+        status = tx.get('final_result', 'N/A')
+        contract_ret = tx.get('contract_ret', 'N/A')
+
+        if timestamp != 'N/A':
+            formatted_time = datetime.fromtimestamp(int(timestamp)/1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+        else:
+            formatted_time = 'N/A'
+
+        formatted_message += f"📊 <strong>Transaction:</strong> <a href='https://tronscan.org/#/transaction/{tx_hash}'>{tx_hash[:8]}...{tx_hash[-8:]}</a>\n"
+        formatted_message += f"⏰ <strong>Time:</strong> {formatted_time}\n"
+        formatted_message += f"📤 <strong>From:</strong> {from_address[:8]}...{from_address[-8:]}\n"
+        formatted_message += f"📥 <strong>To:</strong> {to_address[:8]}...{to_address[-8:]}\n"
+        formatted_message += f"💰 <strong>Amount:</strong> {amount:,.6f} {token_info.get('tokenAbbr', 'N/A')}\n"
+        formatted_message += f"🚦 <strong>Status:</strong> {status}\n"
+        formatted_message += f"📝 <strong>Contract Result:</strong> {contract_ret}\n"
+        formatted_message += f"🧱 <strong>Block:</strong> {tx.get('block', 'N/A')}\n\n"
+
+    return formatted_message
+
+
+def bench(label, legacy, rendered, number):
+    legacy_time = min(timeit.repeat(legacy, number=number, repeat=5)) / number * 1e6
+    rendered_time = min(timeit.repeat(rendered, number=number, repeat=5)) / number * 1e6
+    print(f"{label:<28} legacy {legacy_time:9.1f} us   renderers {rendered_time:9.1f} us   "
+          f"ratio {rendered_time / legacy_time:5.2f}x")
+
+
+def main():
+    meme_coin = sample_meme_coin()
+    holdings = sample_holdings()
+    transfers = sample_transfers(5)
+    full_page = sample_transfers(8)
+
+    bench("meme coin info", lambda: legacy_meme_coin_info(ADDRESS, meme_coin),
+          lambda: render_meme_coin_info(ADDRESS, meme_coin), 2000)
+    bench("wallet info (20 tokens)", lambda: legacy_wallet_info(ADDRESS, holdings),
+          lambda: render_wallet_info(ADDRESS, holdings), 2000)
+    bench("transfers page (5)", lambda: legacy_wallet_transfers(ADDRESS, transfers),
+          lambda: render_wallet_transfers_page(ADDRESS, transfers, 0, 5), 2000)
+    bench("transfers page (8)", lambda: legacy_wallet_transfers(ADDRESS, full_page),
+          lambda: render_wallet_transfers_page(ADDRESS, full_page, 0, 8), 2000)
+
+if __name__ == '__main__':
+    main()
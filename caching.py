@@ -0,0 +1,163 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class _LoadCancelled(Exception):
+    """Tells callers sharing a load that the caller running it was cancelled."""
+
+
+class LRUCache:
+    """Bounded least-recently-used mapping with hit/miss counters.
+
+    on_evict(key, value), if given, is called for each entry pushed out to
+    stay within maxsize.
+    """
+
+    def __init__(self, maxsize=10_000, on_evict=None):
+        self.maxsize = max(1, int(maxsize))
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        value = self._data.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            evicted = self._data.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(*evicted)
+
+    def pop(self, key, default=None):
+        return self._data.pop(key, default)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class TTLCache:
+    """Bounded mapping whose entries expire after a TTL, with single-flight loading.
+
+    get_or_load() makes concurrent callers for the same missing key share one
+    in-flight load instead of each hitting the upstream. If the caller running
+    the load is cancelled, the others start a new one rather than being
+    cancelled with it.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0, clock=time.monotonic):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._data = OrderedDict()
+        self._inflight = {}
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        self._data[key] = (self.clock() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        self._data.clear()
+
+    async def get_or_load(self, key, loader, ttl=None):
+        """Return the cached value for key, or await loader() once for all concurrent callers."""
+
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except _LoadCancelled:
+                return await self.get_or_load(key, loader, ttl)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.set_exception(_LoadCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting.
+            future.exception()
+            raise
+        else:
+            self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+        }
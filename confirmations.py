@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+
+from tronpy.exceptions import TransactionNotFound
+
+logger = logging.getLogger(__name__)
+
+STATUS_SUCCESS = "SUCCESS"
+STATUS_FAILED = "FAILED"
+STATUS_TIMEOUT = "TIMEOUT"
+
+
+class ConfirmationTracker:
+    """Background poller that settles broadcast transactions.
+
+    Handlers register a txid with an async notify(txid, status, info)
+    callback and return straight away. One task polls get_transaction_info
+    for every pending txid per tick, with bounded concurrency, and calls the
+    callback once the transaction is on chain, failed, or timed out. Callbacks
+    run as their own tasks, so a chat waiting out Telegram's flood limits
+    never holds up other chats' updates or the next poll.
+    """
+
+    def __init__(self, tron, poll_interval=3.0, timeout=120.0, concurrency=16):
+        self.tron = tron
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.concurrency = max(1, int(concurrency))
+        self._pending = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._notifications = set()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def track(self, txid, notify, submitted_at=None):
+        """Start watching txid; notify is awaited once with the final status."""
+
+        self._pending[txid] = (notify, submitted_at or time.time())
+        self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="confirmation-tracker")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        for task in self._notifications:
+            task.cancel()
+        await asyncio.gather(*self._notifications, return_exceptions=True)
+
+        if self._pending:
+            logger.info("Confirmation tracker stopped with %d pending transactions", len(self._pending))
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            # Give a freshly broadcast transaction time to land in a block.
+            await asyncio.sleep(self.poll_interval)
+
+            try:
+                await self._poll()
+            except Exception:
+                logger.exception("Error while polling pending transactions")
+
+    async def _poll(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        txids = list(self._pending)
+
+        async def check(txid):
+            async with semaphore:
+                try:
+                    return txid, await self.tron.get_transaction_info(txid)
+                except TransactionNotFound:
+                    return txid, None
+                except Exception as e:
+                    logger.warning("Error: '%s' occurred while checking transaction %s.", e, txid)
+                    return txid, None
+
+        results = await asyncio.gather(*(check(txid) for txid in txids))
+
+        now = time.time()
+        for txid, info in results:
+            entry = self._pending.get(txid)
+            if entry is None:
+                continue
+
+            notify, submitted_at = entry
+            if info:
+                status = STATUS_FAILED if info.get("result") == "FAILED" else STATUS_SUCCESS
+            elif now - submitted_at > self.timeout:
+                status = STATUS_TIMEOUT
+            else:
+                continue
+
+            del self._pending[txid]
+            task = asyncio.create_task(self._notify(notify, txid, status, info), name="confirmation-notification")
+            self._notifications.add(task)
+            task.add_done_callback(self._notifications.discard)
+
+    async def _notify(self, notify, txid, status, info):
+        try:
+            await notify(txid, status, info)
+        except Exception:
+            logger.exception("Error while notifying the result of transaction %s", txid)
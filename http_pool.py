@@ -0,0 +1,52 @@
+import importlib.util
+import logging
+
+from httpx import AsyncClient, Limits, Timeout
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional h2 package (pip install httpx[http2]).
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class HttpClientPool:
+    """Application-scoped httpx clients, one per upstream (nile, mainnet, tronscan...).
+
+    Each client keeps its own keep-alive connection pool so repeated TRON RPC
+    and Tronscan calls reuse warm TCP/TLS connections. Clients are created on
+    first use and closed together on shutdown.
+    """
+
+    def __init__(self, max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0,
+                 timeout=10.0, connect_timeout=5.0, read_timeout=5.0, http2=True):
+        self.limits = Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = Timeout(timeout=timeout, connect=connect_timeout, read=read_timeout)
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._clients = {}
+
+        if http2 and not HTTP2_AVAILABLE:
+            logger.info("h2 is not installed, falling back to HTTP/1.1 keep-alive")
+
+    def get(self, name):
+        """Return the shared client for name, creating it on first use."""
+
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = AsyncClient(limits=self.limits, timeout=self.timeout, http2=self.http2)
+            self._clients[name] = client
+        return client
+
+    async def close(self):
+        """Close every client and drop its pooled connections."""
+
+        for name, client in self._clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning("Error: '%s' occurred while closing the %s HTTP client.", e, name)
+
+        self._clients.clear()
@@ -0,0 +1,112 @@
+import logging
+import time
+
+from send_queue import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Tokens each command costs; commands that fan out to TronGrid/Tronscan or
+# sign transactions cost more. Anything not listed costs DEFAULT_COST.
+DEFAULT_COMMAND_COSTS = {
+    "start": 0.5,
+    "wallet": 3,
+    "balance": 2,
+    "tokenbalance": 2,
+    "transfer": 5,
+    "swap": 5,
+    "quote": 3,
+    "getmemecoininfo": 3,
+    "getwalletinfo": 4,
+    "getwallettransfers": 3,
+    "watch": 2,
+    "unwatch": 1,
+    "alert": 2,
+    "unalert": 1,
+    "network": 1,
+    "exportkeys": 5,
+    # Inline keyboard button presses (e.g. /getwallettransfers paging).
+    "callback": 1,
+}
+DEFAULT_COST = 1
+
+
+class InboundRateLimiter:
+    """Per-user token buckets for incoming commands.
+
+    Every user gets one bucket of capacity tokens refilling at rate tokens
+    per second, and each command takes its cost from it, so a user can
+    burst a few cheap commands but not hammer the expensive ones. Checks are
+    a dictionary lookup; buckets idle for longer than idle_ttl are swept
+    every sweep_interval seconds.
+    """
+
+    def __init__(self, rate=0.5, capacity=20, costs=None, idle_ttl=600.0, sweep_interval=60.0, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.costs = {**DEFAULT_COMMAND_COSTS, **(costs or {})}
+        # A bucket idle this long has refilled completely, so dropping it loses nothing.
+        self.idle_ttl = max(idle_ttl, capacity / rate)
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self._buckets = {}
+        self._warned_until = {}
+        self._last_sweep = clock()
+        self.limited = 0
+
+    def check(self, user_id, command):
+        """Charge user_id for command; return 0 if allowed, else seconds until it would be."""
+
+        now = self.clock()
+        if now - self._last_sweep > self.sweep_interval:
+            self._sweep(now)
+
+        cost = min(self.costs.get(command, DEFAULT_COST), self.capacity)
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.rate, self.capacity, now)
+
+        delay = bucket.delay(now, cost)
+        if delay > 0:
+            self.limited += 1
+            return delay
+
+        bucket.take(now, cost)
+        return 0
+
+    def should_warn(self, user_id, delay):
+        """True once per limited stretch, so a flood is answered with a single warning."""
+
+        now = self.clock()
+        if self._warned_until.get(user_id, 0) > now:
+            return False
+        self._warned_until[user_id] = now + delay
+        return True
+
+    def stats(self):
+        return {"users": len(self._buckets), "limited": self.limited}
+
+    def _sweep(self, now):
+        idle = [user_id for user_id, bucket in self._buckets.items() if now - bucket.updated > self.idle_ttl]
+        for user_id in idle:
+            del self._buckets[user_id]
+        for user_id in [user_id for user_id, until in self._warned_until.items() if until <= now]:
+            del self._warned_until[user_id]
+        self._last_sweep = now
+
+        if idle:
+            logger.debug("Evicted %d idle rate limit buckets", len(idle))
+
+
+def command_of(update):
+    """Return the command name of update ("callback" for button presses), or None."""
+
+    if update.callback_query is not None:
+        return "callback"
+
+    message = update.effective_message
+    text = message.text if message is not None else None
+    if not text or not text.startswith("/"):
+        return None
+
+    command = text[1:].split(maxsplit=1)
+    return command[0].split("@", 1)[0].lower() if command else None
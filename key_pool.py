@@ -0,0 +1,205 @@
+import asyncio
+import csv
+import io
+import logging
+import time
+
+from tronpy.keys import PrivateKey
+
+from key_store import KeyCipher
+from wallet_store import INSERT_ADDRESS_SQL, SELECT_WALLET_SQL
+
+logger = logging.getLogger(__name__)
+
+# Keys already handed to a user are skipped, so re-importing an export never assigns a wallet twice.
+INSERT_POOL_KEY_SQL = """INSERT INTO key_pool(address, private_key, hex_address, created_at)
+                         SELECT ?,?,?,? WHERE NOT EXISTS (SELECT 1 FROM addresses WHERE address=?)
+                         ON CONFLICT(address) DO NOTHING"""
+SELECT_POOL_HEAD_SQL = "SELECT id, address, private_key, hex_address FROM key_pool ORDER BY id LIMIT 1;"
+DELETE_POOL_KEY_SQL = "DELETE FROM key_pool WHERE id=?;"
+COUNT_POOL_SQL = "SELECT COUNT(*) FROM key_pool;"
+SELECT_POOL_SQL = "SELECT address, private_key FROM key_pool ORDER BY id;"
+SELECT_WALLETS_SQL = "SELECT user_id, address, private_key FROM addresses ORDER BY id;"
+
+
+def generate_keypair():
+    """Derive a new (address, private_key, hex_address) locally, without any RPC."""
+
+    private_key = PrivateKey.random()
+    public_key = private_key.public_key
+    return public_key.to_base58check_address(), private_key.hex(), public_key.to_hex_address()
+
+
+def keypair_from_hex(private_key_hex):
+    private_key = PrivateKey.fromhex(private_key_hex)
+    public_key = private_key.public_key
+    return public_key.to_base58check_address(), private_key.hex(), public_key.to_hex_address()
+
+
+class KeyPool:
+    """Pre-generated wallets waiting in the database for their first /wallet.
+
+    A background worker tops the pool up to target keys whenever it drops
+    below low_water, generating keypairs off the event loop and inserting
+    each batch in one transaction. claim() moves one key into addresses in
+    a single transaction, so first-wallet latency does not depend on how
+    many users arrive at once. Keys are stored sealed by cipher and move
+    into addresses without being decrypted.
+    """
+
+    def __init__(self, wallet_store, cipher=None, target=500, low_water=100, batch_size=100):
+        self.wallet_store = wallet_store
+        self.cipher = cipher or KeyCipher()
+        self.target = max(0, int(target))
+        self.low_water = max(0, min(int(low_water), self.target))
+        self.batch_size = max(1, int(batch_size))
+        self.size = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def claim(self, user_id):
+        """Give user_id a wallet from the pool and return (address, private_key, created).
+
+        A user who already has a wallet gets it back and the pool is left
+        untouched. An empty pool falls back to a key generated on the spot.
+        """
+
+        async with self.wallet_store.connection() as conn:
+            await conn.execute("BEGIN IMMEDIATE;")
+            try:
+                async with conn.execute(SELECT_POOL_HEAD_SQL) as cursor:
+                    row = await cursor.fetchone()
+                if row is None:
+                    key_id, (address, private_key, hex_address) = None, generate_keypair()
+                    stored = self.cipher.seal(address, private_key)
+                else:
+                    key_id, address, stored, hex_address = row
+
+                cursor = await conn.execute(INSERT_ADDRESS_SQL, (address, stored, hex_address, user_id))
+                created = cursor.rowcount == 1
+                await cursor.close()
+
+                if created and key_id is not None:
+                    await conn.execute(DELETE_POOL_KEY_SQL, (key_id,))
+                elif not created:
+                    async with conn.execute(SELECT_WALLET_SQL, (user_id,)) as cursor:
+                        address, stored = await cursor.fetchone()
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+
+        if created and key_id is not None:
+            self.size = max(0, self.size - 1)
+            if self.size < self.low_water:
+                self._wakeup.set()
+        elif created:
+            logger.warning("Key pool empty, generated a wallet inline for user %s", user_id)
+            self._wakeup.set()
+
+        self.wallet_store.address_cache.set(user_id, address)
+        return address, self.cipher.open(address, stored), created
+
+    async def add(self, keypairs):
+        """Insert (address, private_key, hex_address) tuples in one transaction; return how many were new."""
+
+        now = time.time()
+        rows = [
+            (address, self.cipher.seal(address, private_key), hex_address, now, address)
+            for address, private_key, hex_address in keypairs
+        ]
+        async with self.wallet_store.connection() as conn:
+            before = conn.total_changes
+            await conn.executemany(INSERT_POOL_KEY_SQL, rows)
+            added = conn.total_changes - before
+            await conn.commit()
+
+        self.size += added
+        return added
+
+    async def import_csv(self, data):
+        """Add the private keys in a CSV export (or one hex key per line) to the pool.
+
+        Returns (added, rejected): rows whose key is malformed or whose
+        address column does not match the key are rejected. Keys already in
+        the pool or assigned to a user are skipped.
+        """
+
+        keypairs, rejected = [], 0
+        for row in csv.reader(io.StringIO(data)):
+            fields = [field.strip() for field in row if field.strip()]
+            if not fields or fields[-1] == "private_key":
+                continue
+            try:
+                keypair = keypair_from_hex(fields[-1])
+            except Exception:
+                rejected += 1
+                continue
+            if len(fields) > 1 and fields[-2] != keypair[0]:
+                rejected += 1
+                continue
+            keypairs.append(keypair)
+
+        added = await self.add(keypairs) if keypairs else 0
+        return added, rejected
+
+    async def export_csv(self, what="wallets"):
+        """Return the assigned wallets (or, with what="pool", the unassigned keys) as CSV, decrypted."""
+
+        out = io.StringIO()
+        writer = csv.writer(out)
+        async with self.wallet_store.connection() as conn:
+            if what == "pool":
+                writer.writerow(("address", "private_key"))
+                async with conn.execute(SELECT_POOL_SQL) as cursor:
+                    async for address, stored in cursor:
+                        writer.writerow((address, self.cipher.open(address, stored)))
+            else:
+                writer.writerow(("user_id", "address", "private_key"))
+                async with conn.execute(SELECT_WALLETS_SQL) as cursor:
+                    async for user_id, address, stored in cursor:
+                        writer.writerow((user_id, address, self.cipher.open(address, stored)))
+        return out.getvalue()
+
+    async def start(self):
+        async with self.wallet_store.connection() as conn:
+            async with conn.execute(COUNT_POOL_SQL) as cursor:
+                self.size = (await cursor.fetchone())[0]
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="key-pool")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self):
+        return {"size": self.size, "target": self.target, "low_water": self.low_water}
+
+    async def _run(self):
+        while True:
+            if self.size >= self.low_water:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            try:
+                await self._refill()
+            except Exception:
+                logger.exception("Error while refilling the key pool")
+                await asyncio.sleep(5)
+
+    async def _refill(self):
+        while self.size < self.target:
+            count = min(self.batch_size, self.target - self.size)
+            # Key derivation is CPU work; keep it off the event loop.
+            keypairs = await asyncio.to_thread(lambda: [generate_keypair() for _ in range(count)])
+            await self.add(keypairs)
+
+        logger.info("Key pool refilled to %d keys", self.size)
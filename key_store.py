@@ -0,0 +1,200 @@
+import base64
+import binascii
+import hashlib
+import logging
+
+from Crypto.Cipher import ChaCha20_Poly1305
+from Crypto.Random import get_random_bytes
+from tronpy.keys import PrivateKey
+
+from caching import TTLCache
+from wallet_store import SELECT_WALLET_SQL
+
+logger = logging.getLogger(__name__)
+
+ENCRYPTED_PREFIX = "enc1:"
+NONCE_SIZE = 12
+TAG_SIZE = 16
+DATA_KEY_SIZE = 32
+KEY_ID_SIZE = 4
+
+SELECT_PLAINTEXT_KEYS_SQL = {
+    "addresses": "SELECT id, address, private_key FROM addresses WHERE private_key NOT LIKE 'enc1:%';",
+    "key_pool": "SELECT id, address, private_key FROM key_pool WHERE private_key NOT LIKE 'enc1:%';",
+}
+UPDATE_KEY_SQL = {
+    "addresses": "UPDATE addresses SET private_key=? WHERE id=?;",
+    "key_pool": "UPDATE key_pool SET private_key=? WHERE id=?;",
+}
+
+
+class KeyDecryptionError(Exception):
+    pass
+
+
+def parse_master_key(value):
+    """Decode a 32-byte master key given as 64 hex characters or base64."""
+
+    value = value.strip()
+    try:
+        key = bytes.fromhex(value) if len(value) == 64 else base64.b64decode(value, validate=True)
+    except (ValueError, binascii.Error):
+        raise ValueError("WALLET_MASTER_KEY must be 32 bytes as hex or base64") from None
+    if len(key) != 32:
+        raise ValueError("WALLET_MASTER_KEY must be 32 bytes as hex or base64")
+    return key
+
+
+def is_encrypted(stored):
+    return stored.startswith(ENCRYPTED_PREFIX)
+
+
+class KeyCipher:
+    """Envelope encryption for stored private keys.
+
+    Every key gets its own random data key; the private key is sealed with
+    ChaCha20-Poly1305 under the data key, and the data key under the master
+    key, both with the wallet address as associated data so a ciphertext
+    cannot be moved to another row. Without a master key, keys pass through
+    as hex.
+
+    ChaCha20-Poly1305 rather than AES-GCM: pycryptodome's GCM setup costs
+    about twice as much per message, and every open does two of them.
+    """
+
+    def __init__(self, master_key=None):
+        self.master_key = master_key
+        self.key_id = hashlib.sha256(master_key).digest()[:KEY_ID_SIZE] if master_key else None
+
+    @property
+    def enabled(self):
+        return self.master_key is not None
+
+    def seal(self, address, private_key):
+        """Return the stored form of private_key (hex) for address."""
+
+        if not self.enabled:
+            return private_key
+
+        aad = address.encode()
+        data_key = get_random_bytes(DATA_KEY_SIZE)
+        wrapped = _encrypt(self.master_key, data_key, aad)
+        sealed = _encrypt(data_key, bytes.fromhex(private_key), aad)
+        return ENCRYPTED_PREFIX + base64.b64encode(self.key_id + wrapped + sealed).decode()
+
+    def open(self, address, stored):
+        """Return the private key (hex) for address from its stored form."""
+
+        if not is_encrypted(stored):
+            return stored
+        if not self.enabled:
+            raise KeyDecryptionError("Private key is encrypted but WALLET_MASTER_KEY is not set")
+
+        blob = base64.b64decode(stored[len(ENCRYPTED_PREFIX):])
+        if blob[:KEY_ID_SIZE] != self.key_id:
+            raise KeyDecryptionError("Private key was encrypted with a different master key")
+
+        aad = address.encode()
+        wrapped_size = NONCE_SIZE + DATA_KEY_SIZE + TAG_SIZE
+        wrapped = blob[KEY_ID_SIZE:KEY_ID_SIZE + wrapped_size]
+        sealed = blob[KEY_ID_SIZE + wrapped_size:]
+        try:
+            data_key = _decrypt(self.master_key, wrapped, aad)
+            return _decrypt(data_key, sealed, aad).hex()
+        except ValueError:
+            raise KeyDecryptionError(f"Private key for {address} failed authentication") from None
+
+
+class KeyStore:
+    """Signing keys for users' wallets, decrypted on demand.
+
+    Decrypting and parsing a key costs two AEAD opens and a secp256k1
+    public key derivation, so the resulting PrivateKey objects are kept in a
+    small TTL cache: a user signing several transactions in a row pays that
+    once per ttl seconds. Concurrent lookups for one user share a load.
+    """
+
+    def __init__(self, wallet_store, cipher=None, ttl=300.0, cache_size=1024):
+        self.wallet_store = wallet_store
+        self.cipher = cipher or KeyCipher()
+        self._unlocked = TTLCache(maxsize=cache_size, ttl=ttl)
+
+    async def signing_key(self, user_id):
+        """Return (address, PrivateKey) for user_id, or None if they have no wallet."""
+
+        wallet = await self._unlocked.get_or_load(user_id, lambda: self._unlock(user_id))
+        if wallet is None:
+            # Not cached, so the wallet is picked up as soon as it is created.
+            self._unlocked.pop(user_id)
+        return wallet
+
+    async def reveal(self, user_id):
+        """Return (address, private_key hex) for user_id, or None; used to show the key to its owner."""
+
+        wallet = await self.signing_key(user_id)
+        if wallet is None:
+            return None
+        return wallet[0], wallet[1].hex()
+
+    def forget(self, user_id=None):
+        """Drop user_id's unlocked key, or every one of them."""
+
+        if user_id is None:
+            self._unlocked.clear()
+        else:
+            self._unlocked.pop(user_id)
+
+    def stats(self):
+        return self._unlocked.stats()
+
+    async def encrypt_existing(self):
+        """Seal every key still stored in plaintext; return how many were sealed."""
+
+        if not self.cipher.enabled:
+            return 0
+
+        sealed = 0
+        async with self.wallet_store.connection() as conn:
+            await conn.execute("BEGIN IMMEDIATE;")
+            try:
+                for table, select_sql in SELECT_PLAINTEXT_KEYS_SQL.items():
+                    async with conn.execute(select_sql) as cursor:
+                        rows = await cursor.fetchall()
+                    await conn.executemany(UPDATE_KEY_SQL[table], [
+                        (self.cipher.seal(address, private_key), row_id) for row_id, address, private_key in rows
+                    ])
+                    sealed += len(rows)
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+
+        if sealed:
+            logger.info("Encrypted %d plaintext private keys", sealed)
+        return sealed
+
+    async def _unlock(self, user_id):
+        async with self.wallet_store.connection() as conn:
+            async with conn.execute(SELECT_WALLET_SQL, (user_id,)) as cursor:
+                row = await cursor.fetchone()
+
+        if row is None:
+            return None
+
+        address, stored = row
+        self.wallet_store.address_cache.set(user_id, address)
+        return address, PrivateKey.fromhex(self.cipher.open(address, stored))
+
+
+def _encrypt(key, plaintext, aad):
+    nonce = get_random_bytes(NONCE_SIZE)
+    cipher = ChaCha20_Poly1305.new(key=key, nonce=nonce)
+    cipher.update(aad)
+    ciphertext, tag = cipher.encrypt_and_digest(plaintext)
+    return nonce + ciphertext + tag
+
+
+def _decrypt(key, blob, aad):
+    cipher = ChaCha20_Poly1305.new(key=key, nonce=blob[:NONCE_SIZE])
+    cipher.update(aad)
+    return cipher.decrypt_and_verify(blob[NONCE_SIZE:-TAG_SIZE], blob[-TAG_SIZE:])
@@ -1,37 +1,129 @@
 import os
+import asyncio
 import logging
+from html import escape
 from dotenv import load_dotenv
 from telegram import Update
-import requests
-from telegram import ReplyKeyboardRemove
-import aiosqlite
-from sqlite3 import Error
-from tronpy import Tron
-from tronpy.providers import HTTPProvider
-from tronpy.keys import PrivateKey
-from httpx import AsyncClient, Timeout, Limits
-from tronpy.providers.async_http import AsyncHTTPProvider
-from tronpy.defaults import CONF_NILE, CONF_MAINNET
+from telegram import ReplyKeyboardRemove, InlineKeyboardButton, InlineKeyboardMarkup, InputFile
+from telegram.error import BadRequest
+from tronpy.keys import PrivateKey, is_address
+from tronpy.exceptions import ApiError, BadSignature, TaposError, TransactionError, UnknownError, ValidationError
 from tronpy import AsyncTron
-from datetime import datetime, timezone
+from wallet_store import WalletStore
+from http_pool import HttpClientPool
+from tron_provider import MultiEndpointProvider
+from tronscan import TronscanClient, TronscanError, SUNSWAP_TRX_ADDRESS
+from token_metadata import TokenMetadataCache
+from caching import TTLCache
+from update_processor import PerUserUpdateProcessor
+from confirmations import ConfirmationTracker, STATUS_SUCCESS, STATUS_FAILED
+from tx_journal import TransactionJournal, DuplicateTransfer
+import tx_journal
+from account_resources import AccountResourceCache
+from message_templates import render_meme_coin_info, render_wallet_info, render_wallet_transfers_page, render_watch_event, render_price_alert, render_swap_quote
+from swap_quotes import SwapQuoter
+from swap_executor import SwapExecutor, ApprovalError
+from price_alerts import PriceAlertEngine, AlertLimitReached, parse_threshold, ABOVE, BELOW
+from inbound_limits import InboundRateLimiter, command_of
+from send_queue import SendQueue, NOTIFICATION
+from watcher import WalletWatcher, SubscriptionLimitReached
+from key_pool import KeyPool
+from key_store import KeyCipher, KeyStore, KeyDecryptionError, parse_master_key
+from portfolio import PortfolioCache
+from transfer_pages import TransferPager, CALLBACK_PREFIX, callback_data, parse_callback_data
+from network import Network, NetworkSelector, load_profiles
 
 from telegram.ext import (
     Application,
+    ApplicationHandlerStop,
+    CallbackQueryHandler,
     CommandHandler,
     ContextTypes,
+    MessageHandler,
+    filters,
+    TypeHandler,
 )
 
 # Load environment variables
 load_dotenv()
 
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
+BOT_MODE = os.getenv('BOT_MODE', 'polling')
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '')
+WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN')
+CONCURRENT_UPDATES = int(os.getenv('CONCURRENT_UPDATES', '64'))
+CONFIRMATION_POLL_INTERVAL = float(os.getenv('CONFIRMATION_POLL_INTERVAL', '3'))
+CONFIRMATION_TIMEOUT = float(os.getenv('CONFIRMATION_TIMEOUT', '120'))
+TRANSFER_DEDUPE_WINDOW = float(os.getenv('TRANSFER_DEDUPE_WINDOW', '60'))
+ACCOUNT_RESOURCES_TTL = float(os.getenv('ACCOUNT_RESOURCES_TTL', '5'))
+WATCH_POLL_INTERVAL = float(os.getenv('WATCH_POLL_INTERVAL', '3'))
+WATCH_BLOCK_BATCH = int(os.getenv('WATCH_BLOCK_BATCH', '20'))
+WATCH_MAX_LAG = int(os.getenv('WATCH_MAX_LAG', '200'))
+WATCH_LIMIT_PER_CHAT = int(os.getenv('WATCH_LIMIT_PER_CHAT', '20'))
+RATE_LIMIT_RATE = float(os.getenv('RATE_LIMIT_RATE', '0.5'))
+RATE_LIMIT_CAPACITY = float(os.getenv('RATE_LIMIT_CAPACITY', '20'))
+RATE_LIMIT_COSTS = os.getenv('RATE_LIMIT_COSTS', '')
+SEND_GLOBAL_RATE = float(os.getenv('SEND_GLOBAL_RATE', '30'))
+SEND_PRIVATE_CHAT_RATE = float(os.getenv('SEND_PRIVATE_CHAT_RATE', '1'))
+SEND_GROUP_CHAT_RATE = float(os.getenv('SEND_GROUP_CHAT_RATE', '0.33'))
+SEND_CHAT_BURST = int(os.getenv('SEND_CHAT_BURST', '3'))
+SEND_MAX_RETRIES = int(os.getenv('SEND_MAX_RETRIES', '3'))
+PRICE_ALERT_INTERVAL = float(os.getenv('PRICE_ALERT_INTERVAL', '60'))
+PRICE_ALERT_CONCURRENCY = int(os.getenv('PRICE_ALERT_CONCURRENCY', '4'))
+PRICE_ALERT_LIMIT_PER_CHAT = int(os.getenv('PRICE_ALERT_LIMIT_PER_CHAT', '20'))
 BASE_URL = os.getenv('BASE_URL')
 TRON_GRID_API_KEY = os.getenv('TRON_GRID_API_KEY')
-
-# Set up Tron client
-
-client = Tron(HTTPProvider(api_key=TRON_GRID_API_KEY), network='nile')
-# client = Tron(HTTPProvider(api_key=TRON_GRID_API_KEY), network='mainnet')
+TRON_GRID_API_KEYS = [key.strip() for key in os.getenv('TRON_GRID_API_KEYS', TRON_GRID_API_KEY or '').split(',') if key.strip()]
+TRON_NETWORKS = [name.strip() for name in os.getenv('TRON_NETWORKS', 'nile,mainnet').split(',') if name.strip()]
+DEFAULT_NETWORK = os.getenv('DEFAULT_NETWORK', 'nile')
+MARKET_DATA_NETWORK = os.getenv('MARKET_DATA_NETWORK', 'mainnet')
+USER_NETWORK_CACHE_SIZE = int(os.getenv('USER_NETWORK_CACHE_SIZE', '10000'))
+TRON_HEDGE_AFTER = float(os.getenv('TRON_HEDGE_AFTER', '0.5'))
+TRON_ENDPOINT_COOLDOWN = float(os.getenv('TRON_ENDPOINT_COOLDOWN', '30'))
+TRON_HEALTH_INTERVAL = float(os.getenv('TRON_HEALTH_INTERVAL', '15'))
+WALLET_DB = os.getenv('WALLET_DB', 'wallet.db')
+WALLET_DB_POOL_SIZE = int(os.getenv('WALLET_DB_POOL_SIZE', '4'))
+WALLET_ADDRESS_CACHE_SIZE = int(os.getenv('WALLET_ADDRESS_CACHE_SIZE', '10000'))
+WALLET_MASTER_KEY = os.getenv('WALLET_MASTER_KEY')
+KEY_CACHE_TTL = float(os.getenv('KEY_CACHE_TTL', '300'))
+KEY_CACHE_SIZE = int(os.getenv('KEY_CACHE_SIZE', '1024'))
+KEY_POOL_TARGET = int(os.getenv('KEY_POOL_TARGET', '500'))
+KEY_POOL_LOW_WATER = int(os.getenv('KEY_POOL_LOW_WATER', '100'))
+KEY_POOL_BATCH_SIZE = int(os.getenv('KEY_POOL_BATCH_SIZE', '100'))
+ADMIN_USER_IDS = {int(user_id) for user_id in os.getenv('ADMIN_USER_IDS', '').split(',') if user_id.strip()}
+HTTP_MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', '100'))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', '20'))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_KEEPALIVE_EXPIRY', '30'))
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '10'))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '5'))
+HTTP_HTTP2 = os.getenv('HTTP_HTTP2', '1') == '1'
+TRONSCAN_API_KEY = os.getenv('TRONSCAN_API_KEY')
+TRONSCAN_TIMEOUT = float(os.getenv('TRONSCAN_TIMEOUT', '10'))
+TRONSCAN_MAX_RETRIES = int(os.getenv('TRONSCAN_MAX_RETRIES', '3'))
+TRONSCAN_CACHE_SIZE = int(os.getenv('TRONSCAN_CACHE_SIZE', '2048'))
+TRONSCAN_TOKEN_TTL = float(os.getenv('TRONSCAN_TOKEN_TTL', '60'))
+TRONSCAN_ACCOUNT_TOKENS_TTL = float(os.getenv('TRONSCAN_ACCOUNT_TOKENS_TTL', '30'))
+TRONSCAN_TRANSFERS_TTL = float(os.getenv('TRONSCAN_TRANSFERS_TTL', '10'))
+SWAP_QUOTE_TTL = float(os.getenv('SWAP_QUOTE_TTL', '5'))
+SWAP_QUOTE_PRECISION = int(os.getenv('SWAP_QUOTE_PRECISION', '4'))
+SWAP_ROUTER_ABI_FILE = os.getenv('SWAP_ROUTER_ABI_FILE', 'sunswap_router_abi_{network}.json')
+SWAP_SLIPPAGE_BPS = int(os.getenv('SWAP_SLIPPAGE_BPS', '50'))
+SWAP_DEADLINE = int(os.getenv('SWAP_DEADLINE', '60'))
+SWAP_FEE_LIMIT = int(os.getenv('SWAP_FEE_LIMIT', '100000000'))
+TRANSFERS_PAGE_SIZE = int(os.getenv('TRANSFERS_PAGE_SIZE', '5'))
+TRANSFERS_PAGE_TTL = float(os.getenv('TRANSFERS_PAGE_TTL', '300'))
+TRANSFERS_PAGE_CACHE_SIZE = int(os.getenv('TRANSFERS_PAGE_CACHE_SIZE', '1024'))
+PORTFOLIO_PAGE_SIZE = int(os.getenv('PORTFOLIO_PAGE_SIZE', '200'))
+PORTFOLIO_CONCURRENCY = int(os.getenv('PORTFOLIO_CONCURRENCY', '4'))
+PORTFOLIO_MAX_PAGES = int(os.getenv('PORTFOLIO_MAX_PAGES', '25'))
+PORTFOLIO_TTL = float(os.getenv('PORTFOLIO_TTL', '30'))
+TOKEN_METADATA_TTL = float(os.getenv('TOKEN_METADATA_TTL', '86400'))
+TOKEN_METADATA_CACHE_SIZE = int(os.getenv('TOKEN_METADATA_CACHE_SIZE', '5000'))
+TOKEN_METADATA_CONCURRENCY = int(os.getenv('TOKEN_METADATA_CONCURRENCY', '8'))
 
 # Enable logging
 logging.basicConfig(
@@ -42,6 +134,36 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 
 logger = logging.getLogger(__name__)
 
+def parse_command_costs(value):
+    """Parse "transfer=5,swap=5" into {"transfer": 5.0, "swap": 5.0}."""
+    
+    costs = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        command, _, cost = item.partition("=")
+        costs[command.strip().lstrip("/").lower()] = float(cost)
+    return costs
+
+async def rate_limit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Runs before every handler and drops commands from users over their budget."""
+    
+    command = command_of(update)
+    if command is None or update.effective_user is None:
+        return
+    
+    inbound_limiter = context.bot_data["inbound_limiter"]
+    user_id = update.effective_user.id
+    delay = inbound_limiter.check(user_id, command)
+    if not delay:
+        return
+    
+    logger.info("Rate limited user %s on /%s", user_id, command)
+    text = f"⏳ Too many requests, please try again in {max(1, round(delay))} seconds."
+    if update.callback_query is not None:
+        await update.callback_query.answer(text)
+    elif inbound_limiter.should_warn(user_id, delay):
+        await update.effective_message.reply_text(text)
+    raise ApplicationHandlerStop
+
 async def start_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Displays info on how to use the bot."""
     
@@ -51,37 +173,70 @@ async def start_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         "- Use /tokenbalance <token_symbol>/<token_name> to check your balance of tokens.\n"
         "- Use /transfer <receiver_address> <amount> to transfer tokens to another address.\n"
         "- Use /swap <currency1> <currency2> <amount> to swap tokens.\n"
+        "- Use /quote <currency1> <currency2> <amount> to see the best swap price without swapping.\n"
         "- Use /getmemecoininfo <address> to get the info of the memecoins.\n"
         "- Use /getwalletinfo <address> to get your wallet info.\n"
         "- Use /getwallettransfers <address> <token_address> to get an wallet address's tokens transfers.\n"
+        "- Use /watch <address> to get notified of transfers to or from an address.\n"
+        "- Use /unwatch [address] to stop watching one address, or all of them.\n"
+        "- Use /alert <token_address> above|below <price> to get notified when a token's USD price crosses it.\n"
+        "- Use /unalert <alert_id> to remove a price alert.\n"
+        "- Use /network [name] to see or switch the TRON network your commands use.\n"
     )
 
     await update.message.reply_text(msg)
 
 
-async def get_total_balance_in_trx(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    #get he wallet address from db with user_id
-    get_wallet_info = """
-    SELECT address FROM addresses WHERE user_id=?;   
-    """
+async def user_network(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Network:
+    """The Network the user's commands run on."""
+    
+    return await context.bot_data["network_selector"].get(update.effective_user.id)
+
+
+def swaps_unavailable(network, context):
+    swap_networks = [name for name, other in context.bot_data["networks"].items() if other.swap_executor is not None]
+    if not swap_networks:
+        return f"Swaps are not available on {network.name}."
+    return f"Swaps are not available on {network.name}. Use /network {swap_networks[0]} to switch."
+
+
+async def select_network(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    selector = context.bot_data["network_selector"]
+    user_id = update.effective_user.id
+    
+    if not context.args:
+        network = await selector.get(user_id)
+        await update.message.reply_text(
+            f"You are on {network.name}.\nAvailable networks: {', '.join(selector.networks)}"
+        )
+        return
+    
+    name = context.args[0].lower()
+    try:
+        network = await selector.set(user_id, name)
+    except KeyError:
+        await update.message.reply_text(
+            f"Unknown network. Available networks: {', '.join(selector.networks)}"
+        )
+        return
+    
+    await update.message.reply_text(f"Switched to {network.name}. Explorer: {network.profile.explorer_url}")
 
+
+async def get_total_balance_in_trx(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     try:
-        conn = await create_connection("wallet.db")
-        if conn is None:
-            raise Exception("Error!!! Cannot create/connect the database.")
-        
+        wallet_store = context.bot_data["wallet_store"]
+        network = await user_network(update, context)
         user_id = update.effective_user.id
-        cur = await conn.cursor()
         
         # Check if the user_id already exists in the database
-        await cur.execute(get_wallet_info, (user_id,))
-        rows = await cur.fetchall()
+        address = await wallet_store.get_address(user_id)
         
-        if len(rows) > 0:
+        if address:
             # User exists, return their TRX balance
-            trx_balance = client.get_account_balance(rows[0][0])
+            trx_balance = await network.tron.get_account_balance(address)
             await update.message.reply_text(f"🔐 <strong>Wallet Info</strong> 🔐\n\n"
-                f"📍 <strong>Address:</strong> \n{rows[0][0]}\n\n\n"
+                f"📍 <strong>Address:</strong> \n{address}\n\n\n"
                 f"💸 <strong>Total Account Balance:</strong> \n{trx_balance} TRX",
                 parse_mode="HTML"
             )
@@ -99,46 +254,31 @@ async def get_total_balance_in_trx(update: Update, context: ContextTypes.DEFAULT
             parse_mode="HTML"
         )
         
-def get_token_info(token_id):
-    return client.get_asset(token_id)
-
-
 async def get_token_balance(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     
-    #get the token balance from db with user_id
-    get_wallet_info = """
-    SELECT address FROM addresses WHERE user_id=?;
-    """
-
-    conn = await create_connection("wallet.db")
-    
-    if conn is None:
-        print("Error!!! Cannot create/connect the database.")
-        return
-    
+    wallet_store = context.bot_data["wallet_store"]
+    network = await user_network(update, context)
+    tron = network.tron
+    token_metadata = network.token_metadata
     user_id = update.effective_user.id
-    cur = await conn.cursor()
     
     # Check if the user_id already exists in the database
-    await cur.execute(get_wallet_info, (user_id,))
-    rows = await cur.fetchall()
+    address = await wallet_store.get_address(user_id)
     
-    if len(rows) > 0:
+    if address:
         # User exists, return their TRX balance
-        address = rows[0][0]
         token_symbol = context.args[0].lower()
-        wallet_assets = client.get_account_asset_balances(address)
+        wallet_assets = await tron.get_account_asset_balances(address)
         
         token_balance = 0
         token_name = ""
         token_abbr = ""
         
-        for token_id, balance in wallet_assets.items():
-            token_info = get_token_info(token_id)
-            if token_info['name'].lower() == token_symbol or token_info['abbr'].lower() == token_symbol:
-                token_balance = wallet_assets[token_id]
-                token_name = token_info['name']
-                token_abbr = token_info['abbr']
+        token_info = await token_metadata.find_by_symbol(token_symbol, wallet_assets.keys())
+        if token_info:
+            token_balance = wallet_assets[token_info['id']]
+            token_name = token_info['name']
+            token_abbr = token_info['abbr']
       
         if token_balance != 0:
             await update.message.reply_text(
@@ -160,51 +300,37 @@ async def get_token_balance(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def generate_trx_address(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Generate an address and sends it to the user."""
     
-    get_wallet_info = """
-    SELECT address, private_key FROM addresses WHERE user_id=?;
-    """
-    conn = await create_connection("wallet.db")
-    
-    if conn is None:
-        raise Exception("Error!!! Cannot create/connect the database.")
-    
+    key_store = context.bot_data["key_store"]
+    key_pool = context.bot_data["key_pool"]
     user_id = update.effective_user.id
-
-    cur = await conn.cursor()
-    
-    # Check if the user_id already exists in the database
-    await cur.execute(get_wallet_info, (user_id,))
-    rows = await cur.fetchall()
     
     try:
-        if len(rows) > 0:
+        # Check if the user_id already exists in the database
+        wallet = await key_store.reveal(user_id)
+        
+        if wallet:
             # User exists, return their address and private key
             await update.message.reply_text(
                 f"🔐 <strong>Wallet Info</strong> 🔐\n\n"
-                f"📍 <strong>Address:</strong> \n{rows[0][0]}\n\n"
-                f"🔑 <strong>Private Key:</strong> \n{rows[0][1]}\n\n\n"
+                f"📍 <strong>Address:</strong> \n{wallet[0]}\n\n"
+                f"🔑 <strong>Private Key:</strong> \n{wallet[1]}\n\n\n"
                 f"⚠️ <strong>Disclaimer:</strong>\n Please store your private key and mnemonic securely. "
                 "Anyone with access to these can control your funds. Do not share this information with anyone.",
                 parse_mode="HTML"
             )
         else:
-            private_key = PrivateKey.random()
-            
-            account = client.generate_address(priv_key=private_key)
-
-            await insert_address(conn, account['base58check_address'], account['private_key'], account['hex_address'], user_id)
+            # Hand out a pre-generated key; a concurrent /wallet for the same user gets the stored wallet
+            address, private_key, _ = await key_pool.claim(user_id)
             
             await update.message.reply_text(
             f"🔐 <strong>Wallet Info</strong> 🔐\n\n"
-            f"📍 <strong>Address:</strong> \n{account['base58check_address']}\n\n"
-            f" <strong>Private Key:</strong> \n{account['private_key']}\n\n"
+            f"📍 <strong>Address:</strong> \n{address}\n\n"
+            f" <strong>Private Key:</strong> \n{private_key}\n\n"
             f"⚠️ <strong>Disclaimer:</strong>\n Please store your private key and mnemonic securely. "
             "Anyone with access to these can control your funds. Do not share this information with anyone.",
             parse_mode="HTML"
         )
         
-        await conn.close()
-        
     except Exception as e:
         await update.message.reply_text(
             f"🔐 <strong>Wallet Info</strong> 🔐\n\n"
@@ -212,82 +338,25 @@ async def generate_trx_address(update: Update, context: ContextTypes.DEFAULT_TYP
             parse_mode="HTML"
         )
     
-async def insert_address(conn, address, private_key, mnemonic, user_id):
-    sql = """INSERT INTO addresses(address, private_key, mnemonic, user_id)
-             VALUES(?,?,?,?)"""
-             
-    cur = await conn.cursor()
-    await cur.execute(sql, (address, private_key, mnemonic, user_id))
-    await conn.commit()
-    
+    # Get ERC-20 token balances
+# Errors tronpy raises for a broadcast the node answered and refused
+BROADCAST_REJECTIONS = (ApiError, BadSignature, TaposError, TransactionError, UnknownError, ValidationError)
 
-async def create_connection(db_file):
-    """Create a database connection to the SQLite database specified by db_file."""
-    
-    create_table_sql = """
-        CREATE TABLE IF NOT EXISTS addresses (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            address TEXT NOT NULL,
-            private_key TEXT NOT NULL,
-            mnemonic TEXT NOT NULL,
-            user_id INTEGER NOT NULL
-        );
-        """
-        
-    check_table_sql = """
-        SELECT name FROM sqlite_master WHERE type='table' AND name='addresses'
-    """    
-        
-    connection = None
-    
-    try:
-        connection = await aiosqlite.connect(db_file)
-        print(f"Database connected to SQLite: {db_file}")
-        
-        if connection is not None:
-            async with connection.cursor() as cursor:
-                check = await cursor.execute(check_table_sql)
-                table_exists = await check.fetchone()
-                
-                if table_exists is None:
-                    await create_table(connection, create_table_sql)
-            
-    except Error as e:
-        print(f"Error: '{e}' occurred while connecting to the database.")
-        
-    return connection
 
-async def create_table(connection, create_table_sql):
-    """Create a table from the create_table_sql statement."""
+def rejected_by_node(error):
+    """True when error says the node refused the transaction, so it was certainly not accepted."""
     
-    try:
-        async with connection.cursor() as cursor:
-            await cursor.execute(create_table_sql)
-            await connection.commit()
-            print("Table created successfully.")
-            
-    except Error as e:
-        print(f"Error: '{e}' occurred while creating the table.")
+    if not isinstance(error, BROADCAST_REJECTIONS):
+        return False
+    # The node already has this transaction: it went through on an earlier attempt
+    return "DUP_TRANSACTION_ERROR" not in str(error.args)
 
-    # Get ERC-20 token balances
-async def transfer(receiver_address: str, sender_address: str, sender_private_key: str, amount: int):
+async def transfer(client: AsyncTron, receiver_address: str, sender_address: str, priv_key: PrivateKey, amount: int,
+                   journal: TransactionJournal = None, journal_id: int = None):
     
+    txid = None
     try:
         print(f"Sending {amount} TRX from {sender_address} to {receiver_address}")
-        
-        _http_client = AsyncClient(limits=Limits(max_connections=100, max_keepalive_connections=20),
-                                timeout=Timeout(timeout=10, connect=5, read=5))
-        
-        print(f"Connecting to {_http_client}")
-        
-        provider = AsyncHTTPProvider(CONF_NILE, client=_http_client)
-        client = AsyncTron(provider=provider)
-        
-        print(f"Connected to {client} using {provider}")
-
-        priv_key = PrivateKey(bytes.fromhex(sender_private_key))
-        
-        print(f"Private key: {priv_key}")
          
         txb = (
             client.trx.transfer(sender_address, receiver_address, amount)
@@ -302,31 +371,90 @@ async def transfer(receiver_address: str, sender_address: str, sender_private_ke
         
         print(f"Transaction: {txn}")
         
+        # Record the txid before broadcasting so a restart can still find the outcome
+        if journal is not None:
+            await journal.mark_built(journal_id, txn.txid)
+        txid = txn.txid
+        
         txn_ret = await txn.sign(priv_key).broadcast()
         
         print(txn_ret)
-
-        await txn_ret.wait()
-        await client.close()
         
+        if journal is not None:
+            await journal.mark_broadcast(journal_id, txn_ret['txid'])
+        
+        # Confirmation is left to the ConfirmationTracker so the handler can reply right away
         return txn_ret
     
     except Exception as e:
+        if txid is not None and not rejected_by_node(e):
+            # A timeout or 5xx can come after the node accepted the transaction; the row
+            # stays built so the ConfirmationTracker (and a restart) settles it
+            logger.warning("Outcome of transfer %s unknown after: %r", txid, e)
+            return {'txid': txid}
+        if journal is not None:
+            await journal.mark_error(journal_id, e)
         raise Exception('Error in transfer: {}'.format(e))
 
-async def transfer_trx(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def check_resources(check):
+    """Await a resource check, treating lookup errors as "no shortfall" so the chain has the final say."""
     
-    get_wallet_info = """
-    SELECT address, private_key FROM addresses WHERE user_id=?;
-    """
+    try:
+        return await check
+    except Exception as e:
+        logger.warning("Error: '%s' occurred while checking account resources.", e)
+        return None
+
+
+def format_transfer_info(profile, sender_address, receiver_address, amount, txid):
+    return (
+        f"🔐 <strong>Transfer Info</strong> 🔐\n\n"
+        f"📍 <strong>Sender Address:</strong> \n{sender_address}\n\n"
+        f"📍 <strong>Receiver Address:</strong> \n{receiver_address}\n\n"
+        f"💸 <strong>Amount:</strong> \n{amount/(10 ** 6)} TRX\n\n"
+        f"📝 <strong>Transaction Hash:</strong> \n{profile.tx_url(txid)}\n\n"
+    )
+
+
+def transfer_status_line(status):
+    if status == STATUS_SUCCESS:
+        return "✅ <strong>Status:</strong> Confirmed"
+    if status == STATUS_FAILED:
+        return "❌ <strong>Status:</strong> Failed"
+    return "⚠️ <strong>Status:</strong> Not confirmed yet, check the transaction link"
+
+
+JOURNAL_STATUSES = {
+    STATUS_SUCCESS: tx_journal.STATUS_CONFIRMED,
+    STATUS_FAILED: tx_journal.STATUS_FAILED,
+}
+
+
+def transfer_status_notifier(bot, journal, chat_id, message_id, transfer_info):
+    """Build a ConfirmationTracker callback that journals the final status and updates the transfer reply."""
     
-    _http_client = AsyncClient(limits=Limits(max_connections=100, max_keepalive_connections=20),
-                            timeout=Timeout(timeout=10, connect=5, read=5))
+    async def notify(txid, status, info):
+        if journal is not None:
+            await journal.mark_settled(txid, JOURNAL_STATUSES.get(status, tx_journal.STATUS_TIMEOUT))
+        
+        text = transfer_info + transfer_status_line(status)
+        if message_id is None:
+            await bot.send_message(chat_id, text, parse_mode="HTML")
+            return
+        
+        try:
+            await bot.edit_message_text(text, chat_id=chat_id, message_id=message_id, parse_mode="HTML")
+        except Exception as e:
+            # The original message may be gone or too old to edit, send a follow-up instead
+            logger.warning("Error: '%s' occurred while editing the transfer message.", e)
+            await bot.send_message(chat_id, text, parse_mode="HTML")
     
-    print(f"Connecting to {_http_client}")
+    return notify
+
+async def transfer_trx(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     
-    provider = AsyncHTTPProvider(CONF_NILE, client=_http_client)
-    client = AsyncTron(provider=provider)
+    network = await user_network(update, context)
+    client = network.tron
     
     if(len(context.args)!= 2):
             await update.message.reply_text(
@@ -337,7 +465,7 @@ async def transfer_trx(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         
     #check if the address is valid
     address = context.args[0]
-    if(client.is_address(address) == False):
+    if(is_address(address) == False):
         await update.message.reply_text(
             "Invalid address",
             reply_markup=ReplyKeyboardRemove(),
@@ -354,24 +482,26 @@ async def transfer_trx(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         )
         return
         
-    conn = await create_connection("wallet.db")
-    
-    if conn is None:
-        print("Error!!! Cannot create/connect the database.")
-        return
-    
+    wallet_store = context.bot_data["wallet_store"]
+    key_store = context.bot_data["key_store"]
+    account_resources = network.account_resources
     user_id = update.effective_user.id
-    cur = await conn.cursor()
-    
-    # Check if the user_id already exists in the database
-    await cur.execute(get_wallet_info, (user_id,))
+    amount_sun = amount * (10 ** 6)
     
-    rows = await cur.fetchall()
+    # For known senders, check resources while the signing key is unlocked
+    cached_address = wallet_store.address_cache.get(user_id)
+    if cached_address:
+        wallet, shortfall = await asyncio.gather(
+            key_store.signing_key(user_id),
+            check_resources(account_resources.check_transfer(cached_address, amount_sun)),
+        )
+    else:
+        wallet = await key_store.signing_key(user_id)
+        shortfall = None
     
-    if len(rows) > 0:
+    if wallet:
         # User exists, return their address and private key
-        address = rows[0][0]
-        private_key = rows[0][1]  
+        address, private_key = wallet
         receiver_address = context.args[0]
         
         if(address == receiver_address):
@@ -380,41 +510,64 @@ async def transfer_trx(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
                 parse_mode="HTML"
             )
             return
+    else:
+        await update.message.reply_text(
+            "🔐 <strong>Transfer Info</strong> 🔐\n\n"
+            "⚠️ <strong> Wallet doesn't exist, please create wallet using /wallet command.</strong>\n\n",
+            parse_mode="HTML"
+        )
+        return
     
-    try:
-        bandwidth = await client.get_bandwidth('TVrzEkHN8CXkTjBQHwDKWn9bUrAaWCkrev')
+    if not cached_address:
+        shortfall = await check_resources(account_resources.check_transfer(address, amount_sun))
+    
+    # Refuse before building anything the sender cannot pay for
+    if shortfall:
+        await update.message.reply_text(
+            f"🔐 <strong>You don't have enough resources!</strong> 🔐\n\n{shortfall}",
+            parse_mode="HTML"
+        )
+        return
+    
+    try:            
+        amount = context.args[1]
+        #convert to wei
+        amount = float(amount) * (10 ** 6)
         
-        print(f"Bandwidth: {bandwidth}")
+        journal = context.bot_data["journal"]
         
-        if(int(bandwidth) < 3):
+        # Telegram may redeliver an update, the message identity makes the retry a no-op
+        try:
+            journal_id = await journal.begin(
+                f"{update.effective_chat.id}:{update.message.message_id}",
+                user_id, update.effective_chat.id, address, receiver_address, int(amount), network.name
+            )
+        except DuplicateTransfer as e:
             await update.message.reply_text(
-                "🔐 <strong>You don't have enough bandwidth!</strong> 🔐\n",
+                f"🔐 <strong>Duplicate Transfer</strong> 🔐\n\n"
+                f"⚠️ The same transfer is already {e.status}, it was not sent again.\n\n"
+                f"📝 <strong>Transaction Hash:</strong> \n{e.txid or 'N/A'}\n\n",
                 parse_mode="HTML"
             )
             return
         
-    except Exception as e:
-        print(f"Error: '{e}' occurred while getting bandwidth.")  
-        
-        
-    try:            
-        amount = context.args[1]
-        #convert to wei
-        amount = float(amount) * (10 ** 6)
-        
         # Transfer token
-        transaction = await transfer(receiver_address, address, private_key, int(amount))
+        transaction = await transfer(client, receiver_address, address, private_key, int(amount), journal, journal_id)
         print(transaction)
+        account_resources.invalidate(address)
         
         if(transaction):
-            await update.message.reply_text(
-                f"🔐 <strong>Transfer Info</strong> 🔐\n\n"
-                f"📍 <strong>Sender Address:</strong> \n{address}\n\n"
-                f"📍 <strong>Receiver Address:</strong> \n{receiver_address}\n\n"
-                f"💸 <strong>Amount:</strong> \n{amount/(10 ** 6)} TRX\n\n"
-                f"📝 <strong>Transaction Hash:</strong> \nhttps://nile.tronscan.org/#/transaction/{transaction['txid']}\n\n",
+            transfer_info = format_transfer_info(network.profile, address, receiver_address, int(amount), transaction['txid'])
+            message = await update.message.reply_text(
+                transfer_info + "⏳ <strong>Status:</strong> Pending confirmation",
                 parse_mode="HTML"
             )
+            await journal.set_reply(journal_id, message.message_id)
+            
+            network.confirmations.track(
+                transaction['txid'],
+                transfer_status_notifier(context.bot, journal, message.chat_id, message.message_id, transfer_info)
+            )
         else:
             await update.message.reply_text(
                 "🔐 <strong>Something went wrong!</strong> 🔐\n\n"
@@ -436,18 +589,8 @@ async def transfer_trx(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         
 async def swap(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     
-    get_wallet_info = """
-    SELECT address, private_key FROM addresses WHERE user_id=?;
-    """
-    
-    _http_client = AsyncClient(limits=Limits(max_connections=100, max_keepalive_connections=20),
-                            timeout=Timeout(timeout=10, connect=5, read=5))
-    
-    print(f"Connecting to {_http_client}")
-    
-    provider = AsyncHTTPProvider(CONF_MAINNET, client=_http_client)
-    client = AsyncTron(provider=provider)
-    client2 = Tron(HTTPProvider(api_key=TRON_GRID_API_KEY), network='mainnet')
+    network = await user_network(update, context)
+    client = network.tron
     
 
 
@@ -460,6 +603,10 @@ async def swap(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             reply_markup=ReplyKeyboardRemove(),
         )
         return
+    
+    if network.swap_executor is None:
+        await update.message.reply_text(swaps_unavailable(network, context))
+        return
         
     token_address_1 = context.args[0]
     token_address_2 = context.args[1]
@@ -499,87 +646,114 @@ async def swap(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     
     
     try:
-        conn = await create_connection("wallet.db")
-
-        if conn is None:
-            print("Error!!! Cannot create/connect the database.")
-            return
-
+        wallet_store = context.bot_data["wallet_store"]
+        key_store = context.bot_data["key_store"]
+        account_resources = network.account_resources
         user_id = update.effective_user.id
-        cur = await conn.cursor()
-
-        # Check if the user_id already exists in the database
-        await cur.execute(get_wallet_info, (user_id,))
-        rows = await cur.fetchall()
+        trx_amount = int(amount) * (10 ** 6) if token_address_1 == SUNSWAP_TRX_ADDRESS else 0
+
+        # For known senders, check resources while the signing key is unlocked
+        cached_address = wallet_store.address_cache.get(user_id)
+        if cached_address:
+            wallet, shortfall = await asyncio.gather(
+                key_store.signing_key(user_id),
+                check_resources(account_resources.check_swap(cached_address, trx_amount)),
+            )
+        else:
+            wallet = await key_store.signing_key(user_id)
+            shortfall = None
 
-        if len(rows) > 0:
+        if wallet:
             # User exists, return their address and private key
-            address = rows[0][0]
-            priv_key = rows[0][1]
-            
-        await conn.close()
-        
-        #Smart Router
-        private_key = PrivateKey.fromhex(priv_key)
-        
-        # Smart Router endpoint
-        url = 'https://rot.endjgfsv.link/swap/router'
-        
-        params = {
-            'fromToken': token_address_1,
-            'toToken': token_address_2,
-            'amountIn': str(int(amount) * 1000000),
-            'typeList': 'PSM,CURVE,CURVE_COMBINATION,WTRX,SUNSWAP_V1,SUNSWAP_V2,SUNSWAP_V3'
-        }
-
-        # Make the GET request
-        response = requests.get(url, params=params)
-        best_outcome = None
-        # Check if the request was successful
-        if response.status_code == 200:
-            swap_info = response.json()
-            print(f"Swap Info: {swap_info}")
-            best_outcome = get_best_price(swap_info)
-            print(f"Best Outcome: {best_outcome}")
+            address, private_key = wallet
+
+            if not cached_address:
+                shortfall = await check_resources(account_resources.check_swap(address, trx_amount))
         else:
-            print(f"Request failed with status code {response.status_code}")
+            await update.message.reply_text(
+                "🔐 <strong>Swap Info</strong> 🔐\n\n"
+                "⚠️ <strong> Wallet doesn't exist, please create wallet using /wallet command.</strong>\n\n",
+                parse_mode="HTML"
+            )
+            return
         
-       
-        contract = client2.get_contract("TFVisXFaijZfeyeSjCEVkHfex7HGdTxzF9")
+        # Refuse before quoting or building anything the sender cannot pay for
+        if shortfall:
+            await update.message.reply_text(
+                f"🔐 <strong>You don't have enough resources!</strong> 🔐\n\n{shortfall}",
+                parse_mode="HTML"
+            )
+            return
         
-        print(f"Contract: {contract.functions.swapExactInput(best_outcome['tokens'], best_outcome['poolVersions'], [len(best_outcome['poolVersions']) - 1], best_outcome['poolFees'], (best_outcome['amountIn'], '1', address, '1662825600'))}")
+        swap_executor = network.swap_executor
         
-        txn = (
-             contract.functions.swapExactInput(
-                best_outcome['tokens'],
-                best_outcome['poolVersions'],
-                [len(best_outcome['poolVersions']) - 1],
-                best_outcome['poolFees'],
-                (best_outcome['amountIn'], '1', address, '1662825600'),
-            )
-        )
-        # print(f"Transaction: {txn}")
+        # Smart Router quote
+        amount_in = await swap_executor.to_raw_amount(token_address_1, amount)
+        try:
+            best_outcome = await network.swap_quoter.quote(token_address_1, token_address_2, amount_in)
+        except TronscanError as e:
+            await update.message.reply_text(f"Error fetching swap quotes: {e}")
+            return
         
-        # txn = await txb.build()
-        # print(txn)
-        # txn_ret = await txn.sign(priv_key).broadcast()
-
-        # print(txn_ret)
-        # print(await txn_ret.wait())
-        # await client.close()
+        if best_outcome is None:
+            await update.message.reply_text("No swap route found for these tokens.")
+            return
         
-    
-        await update.message.reply_text(
+        try:
+            txid = await swap_executor.execute(private_key, address, best_outcome)
+        except ApprovalError as e:
+            # The approve is on its way; a retry once it lands skips straight to the swap
+            logger.warning("Swap for user %s stopped: %s (%s)", user_id, e, e.txid)
+            await update.message.reply_text(
+                f"🔐 <strong>Swap not sent</strong> 🔐\n\n"
+                f"⚠️ {escape(str(e))}. Try /swap again once it confirms.\n\n"
+                f"📝 <strong>Approval Hash:</strong> \n{network.profile.tx_url(e.txid)}\n\n",
+                parse_mode="HTML"
+            )
+            return
+        except BROADCAST_REJECTIONS as e:
+            logger.warning("Swap for user %s rejected by the node: %s", user_id, e)
+            await update.message.reply_text(
+                f"🔐 <strong>Swap rejected</strong> 🔐\n\n"
+                f"⚠️ The node refused the transaction: {escape(str(e))}\n",
+                parse_mode="HTML"
+            )
+            return
+        finally:
+            account_resources.invalidate(address)
+        
+        swap_info = (
             f"🔐 <strong>Swap Info</strong> 🔐\n\n"
             f"📍 <strong>Sender Address:</strong> \n{address}\n\n"
             f"📍 <strong>Token Address 1:</strong> \n{token_address_1}\n\n"
             f"📍 <strong>Token Address 2:</strong> \n{token_address_2}\n\n"
-            f"💸 <strong>Amount:</strong> \n{amount}\n\n",
+            f"💸 <strong>Amount:</strong> \n{amount}\n\n"
+            f"📝 <strong>Transaction Hash:</strong> \n{network.profile.tx_url(txid)}\n\n"
+        )
+        message = await update.message.reply_text(
+            swap_info + "⏳ <strong>Status:</strong> Pending confirmation",
             parse_mode="HTML"
         )
         
+        notify = transfer_status_notifier(context.bot, None, message.chat_id, message.message_id, swap_info)
+        
+        async def swap_settled(txid, status, info):
+            if status == STATUS_FAILED:
+                # A revert can mean the router's allowance is gone, check it again next time
+                swap_executor.forget_approval(address, token_address_1)
+            await notify(txid, status, info)
+        
+        network.confirmations.track(txid, swap_settled)
+        
+    except KeyDecryptionError:
+        logger.exception("Could not unlock the signing key of user %s", update.effective_user.id)
+        await update.message.reply_text(
+            "🔐 <strong>Your wallet key could not be unlocked.</strong> 🔐\n\nPlease contact the bot admin.",
+            parse_mode="HTML"
+        )
+        return
     except Exception:
-        # User doesn't exist, return an error message
+        logger.exception("Error while swapping for user %s", update.effective_user.id)
         await update.message.reply_text(
             "🔐 <strong>Something went wrong!</strong> 🔐\n\n"
 
@@ -590,17 +764,43 @@ async def swap(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         )
         return
     
-def get_best_price(swap_data):
-    best_option = None
-    max_amount_out = 0
+async def quote(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if len(context.args) != 3:
+        await update.message.reply_text(
+            "Usage: /quote <token_address> <token_address> <amount>",
+            reply_markup=ReplyKeyboardRemove(),
+        )
+        return
+    
+    token_address_1, token_address_2, amount = context.args
+    
+    if not is_address(token_address_1) or not is_address(token_address_2):
+        await update.message.reply_text("Invalid token address")
+        return
+    if token_address_1 == token_address_2:
+        await update.message.reply_text("You cannot swap the same token!")
+        return
+    if not amount.isnumeric() or int(amount) == 0:
+        await update.message.reply_text("Invalid amount!")
+        return
+    
+    network = await user_network(update, context)
+    if network.swap_quoter is None:
+        await update.message.reply_text(swaps_unavailable(network, context))
+        return
+    
+    try:
+        amount_in = await network.swap_executor.to_raw_amount(token_address_1, amount)
+        best_outcome = await network.swap_quoter.quote(token_address_1, token_address_2, amount_in)
+    except TronscanError as e:
+        await update.message.reply_text(f"Error fetching swap quotes: {e}")
+        return
     
-    for option in swap_data['data']:
-        amount_out = float(option['amountOut'])
-        if amount_out > max_amount_out:
-            max_amount_out = amount_out
-            best_option = option
+    if best_outcome is None:
+        await update.message.reply_text("No swap route found for these tokens.")
+        return
     
-    return best_option
+    await update.message.reply_text(render_swap_quote(amount, best_outcome), parse_mode="HTML")
 
 async def get_meme_coin_info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     
@@ -614,7 +814,7 @@ async def get_meme_coin_info(update: Update, context: ContextTypes.DEFAULT_TYPE)
     address = context.args[0]
     
     # Check if the address is valid
-    if not client.is_address(address):
+    if not is_address(address):
         await update.message.reply_text(
             "Invalid address",
             reply_markup=ReplyKeyboardRemove(),
@@ -622,135 +822,28 @@ async def get_meme_coin_info(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
     
 
-    url = f"https://apilist.tronscanapi.com/api/token_trc20?contract={address}&showAll=1&start=&limit="
-
-    # Make the GET request
-    response = requests.get(url)
-
-    # Check if the request was successful
-    if response.status_code == 200:
-        data = response.json()
-        
-        # Extract relevant information
-        tokens = data.get('trc20_tokens', [])
-        
-        # Prepare the formatted message
-        formatted_message = "🔐 <strong>Meme Coin Info</strong> 🔐\n\n"
-        formatted_message += f"📍 <strong>Address:</strong> \n <a href='https://tronscan.org/#/token20/{address}'>{address}</a>\n"
-
-        if tokens:
-            for token in tokens:
-                name = token.get('name', 'N/A')
-                symbol = token.get('symbol', 'N/A')
-                total_supply = token.get('total_supply', 'N/A')
-                total_supply_with_decimals = token.get('total_supply_with_decimals', 'N/A')
-                holders_count = token.get('holders_count', 'N/A')
-                transfer_24h = token.get('transfer24h', 'N/A')
-                issue_time = token.get('issue_time', 'N/A')
-                transfer_num = token.get('transfer_num', 'N/A')
-                volume_24h = token.get('volume24h', 'N/A')
-                price_trx = token.get('price_trx', 'N/A')
-                liquidity_24h = token.get('liquidity24h', 'N/A')
-                liquidity_24h_rate = token.get('liquidity24h_rate', 'N/A')
-                grey_tag = token.get('greyTag', 'N/A')
-                red_tag = token.get('redTag', 'N/A')
-                blue_tag = token.get('blueTag', 'N/A')
-                icon_url = token.get('icon_url', 'N/A')
-                token_desc = token.get('token_desc', 'N/A')
-                home_page = token.get('home_page', 'N/A')
-                social_media_list = token.get('social_media_list', [])
-                public_tag = token.get('publicTag', 'N/A')
-                email = token.get('email', 'N/A')
-                git_hub = token.get('git_hub', 'N/A')
-                white_paper = token.get('white_paper', 'N/A')
-                issue_address = token.get('issue_address', 'N/A')
-                just_swap_volume_24h = token.get('justSwapVolume24h', 'N/A')
-                just_swap_volume_24h_rate = token.get('justSwapVolume24h_rate', 'N/A')
-                price_in_trx = token.get('market_info', {}).get('priceInTrx', 'N/A')
-                price_in_usd = token.get('market_info', {}).get('priceInUsd', 'N/A')
-                liquidity = token.get('market_info', {}).get('liquidity', 'N/A')
-                gain = token.get('market_info', {}).get('gain', 'N/A')
-                pair_url = token.get('market_info', {}).get('pairUrl', 'N/A')
-                token_price_line = token.get('tokenPriceLine', {}).get('data', [])
-                
-                # Add token details
-                formatted_message += f"""
-💰 <strong>Token Name:</strong> {name}
-🔖 <strong>Symbol:</strong> {symbol.upper()}
-
-📈 <strong>Total Supply:</strong> {total_supply} (with decimals: {total_supply_with_decimals})
-
-📝 <strong>Description:</strong> {token_desc}
-
-👥 <strong>Holders Count:</strong> {holders_count}
-
-🔢 <strong>Total Transfers:</strong> {transfer_num}
-🔄 <strong>Transfers in 24h:</strong> {transfer_24h}
-📉 <strong>Volume (24h):</strong> {volume_24h}
-
-💲 <strong>Price:</strong>
-TRX: {price_in_trx}
-USD: {price_in_usd}
-
-💧 <strong>Liquidity:</strong> 
-{liquidity}
-24h: ${liquidity_24h}
-24h Rate: ${liquidity_24h_rate}
-
-📊 <strong>JustSwap Volume (24h):</strong> {just_swap_volume_24h}
-Rate: {just_swap_volume_24h_rate * 100}%
-
-🕒 <strong>Issue Date:</strong> {issue_time}
-
-
-🏠 <strong>Home Page:</strong> <a href="{home_page}">{home_page}</a>
-🏷️ <strong>Tags:</strong> {grey_tag},{red_tag},{blue_tag}
-📛 <strong>Public Tag:</strong> {public_tag}
-
-📧 <strong>Email:</strong> {email}
-💻 <strong>GitHub:</strong> {git_hub}
-📄 <strong>White Paper:</strong> {white_paper}
-
-🏠 <strong>Issue Address:</strong> {issue_address}
-
-📈 <strong>Gain:</strong> {gain * 100}%
-🔗 <strong>Pair URL:</strong> <a href="{pair_url}">{pair_url}</a>
-"""
-
-                # Add social media links
-                if social_media_list:
-                    formatted_message += "\n📱 <strong>Social Media Links:</strong>\n"
-                    for platform in social_media_list:
-                        name = platform.get('name', 'N/A')
-                        url = platform.get('url', 'N/A').strip('[]""')  # Clean up the URL format
-                        formatted_message += f"   • {name}: <a href='{url}'>{url}</a>\n"
-
-                # Add token price line data
-                if token_price_line:
-                    formatted_message += "\n📊 <strong>Price Over Time (USD):</strong>\n"
-                    for price_point in token_price_line[:5]:  # Limit to 5 most recent data points
-                        timestamp = price_point.get('time', 'N/A')
-                        price_usd = price_point.get('priceUsd', 'N/A')
-                        if timestamp != 'N/A':
-                            # Convert Unix timestamp to datetime
-                            formatted_time = datetime.fromtimestamp(int(timestamp), tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
-                        else:
-                            formatted_time = 'N/A'
-                        formatted_message += f"   • {formatted_time}: {price_usd} USD\n"
-
-                formatted_message += f"\n🖼️ <strong>Icon:</strong> <a href='{icon_url}'>View Icon</a>\n"
-        else:
-            formatted_message += "\nNo tokens found for this address.\n"
-
-    else:
-        formatted_message = f"Error fetching data: {response.status_code}"
+    # Token market data comes from the same network as price alerts, whatever network the user is on
+    network = context.bot_data["market_network"]
+    if network.tronscan is None:
+        await update.message.reply_text(f"Token info is not available on {network.name}.")
+        return
+    
+    try:
+        data = await network.tronscan.token_trc20(address)
+    except TronscanError as e:
+        await update.message.reply_text(
+            f"Error fetching data: {e}",
+            reply_markup=ReplyKeyboardRemove()
+        )
+        return
 
-    # Send the formatted response back to the user
-    await update.message.reply_text(
-        formatted_message,
-        parse_mode="HTML",
-        reply_markup=ReplyKeyboardRemove()
-    )
+    # Send the formatted response back to the user, split at Telegram's message limit
+    for formatted_message in render_meme_coin_info(address, data, network.profile.explorer_url):
+        await update.message.reply_text(
+            formatted_message,
+            parse_mode="HTML",
+            reply_markup=ReplyKeyboardRemove()
+        )
     
 async def get_wallet_info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if not context.args:
@@ -762,58 +855,33 @@ async def get_wallet_info(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     wallet_address = context.args[0]
     
-    if not client.is_address(wallet_address):
+    if not is_address(wallet_address):
         await update.message.reply_text(
             "Invalid address",
             reply_markup=ReplyKeyboardRemove(),
         )
         return
     
-    url = f"https://apilist.tronscanapi.com/api/account/tokens?address={wallet_address}&start=0&limit=20&hidden=0&show=0&sortType=0&sortBy=0&token="
-    
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        data = response.json()
-        tokens = data.get('data', [])
-        
-        formatted_message = f"🔐 <strong>Wallet Info for {wallet_address}</strong> 🔐\n\n"
-        
-        if tokens:
-            formatted_message += "<strong>Token Holdings:</strong>\n\n"
-            total_value_usd = 0
-            for token in tokens:
-                token_name = token.get('tokenName', 'N/A')
-                token_abbr = token.get('tokenAbbr', 'N/A')
-                balance = float(token.get('balance', 0)) / 10**int(token.get('tokenDecimal', 6))
-                token_type = token.get('tokenType', 'N/A')
-                token_price_usd = token.get('tokenPriceInUsd', 0)
-                token_price_trx = token.get('tokenPriceInTrx', 0)
-                amount_usd = token.get('amountInUsd', 0)
-                total_value_usd += amount_usd
-                
-                formatted_message += f"🪙 <strong>{token_name.upper()} ({token_abbr.upper()})</strong>\n"
-                formatted_message += f"   Balance: {balance:,.6f} {token_abbr.upper()}\n"
-                formatted_message += f"   Type: {token_type.upper()}\n"
-                if token_price_usd:
-                    formatted_message += f"   Price: ${token_price_usd:.6f} USD / {token_price_trx:.6f} TRX\n"
-                if amount_usd:
-                    formatted_message += f"   Value: ${amount_usd:.2f} USD\n"
-                formatted_message += "\n"
-            
-            formatted_message += f"💰 <strong>Total Portfolio Value:</strong> ${total_value_usd:.2f} USD\n\n"
-        else:
-            formatted_message += "No tokens found in this wallet.\n"
-        
-        
+    network = await user_network(update, context)
+    if network.portfolio is None:
+        await update.message.reply_text(f"Wallet info is not available on {network.name}.")
+        return
+    
+    try:
+        portfolio = await network.portfolio.get(wallet_address)
+    except TronscanError as e:
         await update.message.reply_text(
-            formatted_message,
-            parse_mode="HTML",
+            f"Error fetching wallet data: {e}",
             reply_markup=ReplyKeyboardRemove()
         )
-    else:
+        return
+    
+    for formatted_message in render_wallet_info(
+        wallet_address, portfolio["tokens"], total=portfolio["total_usd"], count=portfolio["count"], network=network.name,
+    ):
         await update.message.reply_text(
-            f"Error fetching wallet data: {response.status_code}",
+            formatted_message,
+            parse_mode="HTML",
             reply_markup=ReplyKeyboardRemove()
         )
         
@@ -828,82 +896,531 @@ async def get_wallet_transfers(update: Update, context: ContextTypes.DEFAULT_TYP
     wallet_address = context.args[0]
     token_address = context.args[1]
     
-    if not client.is_address(wallet_address) or not client.is_address(token_address):
+    if not is_address(wallet_address) or not is_address(token_address):
         await update.message.reply_text(
             "Invalid wallet or token address",
             reply_markup=ReplyKeyboardRemove(),
         )
         return
     
-    url = f"https://apilist.tronscanapi.com/api/token_trc20/transfers-with-status?limit=30&start=0&address={wallet_address}&trc20Id={token_address}&reverse=true"
-    
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        data = response.json()
-        transactions = data.get('data', [])
-        token_info = data.get('tokenInfo', {})
-        
-        formatted_message = f"🔐 <strong>Recent Transactions for {wallet_address}</strong> 🔐\n\n"
-        formatted_message += f"🪙 <strong>Token:</strong> {token_info.get('tokenName', 'N/A')} ({token_info.get('tokenAbbr', 'N/A')})\n"
-        formatted_message += f"📍 <strong>Token Address:</strong> {token_info.get('tokenId', 'N/A')}\n"
-        formatted_message += f"🏭 <strong>Issuer:</strong> {token_info.get('issuerAddr', 'N/A')}\n\n"
-        
-        if transactions:
-            for tx in transactions:
-                tx_hash = tx.get('hash', 'N/A')
-                from_address = tx.get('from', 'N/A')
-                to_address = tx.get('to', 'N/A')
-                amount = float(tx.get('amount', 0)) / 10**int(tx.get('decimals', 18))
-                timestamp = tx.get('block_timestamp', 'N/A')
-                status = tx.get('final_result', 'N/A')
-                contract_ret = tx.get('contract_ret', 'N/A')
-                
-                if timestamp != 'N/A':
-                    formatted_time = datetime.fromtimestamp(int(timestamp)/1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
-                else:
-                    formatted_time = 'N/A'
-                
-                formatted_message += f"📊 <strong>Transaction:</strong> <a href='https://tronscan.org/#/transaction/{tx_hash}'>{tx_hash[:8]}...{tx_hash[-8:]}</a>\n"
-                formatted_message += f"⏰ <strong>Time:</strong> {formatted_time}\n"
-                formatted_message += f"📤 <strong>From:</strong> {from_address[:8]}...{from_address[-8:]}\n"
-                formatted_message += f"📥 <strong>To:</strong> {to_address[:8]}...{to_address[-8:]}\n"
-                formatted_message += f"💰 <strong>Amount:</strong> {amount:,.6f} {token_info.get('tokenAbbr', 'N/A')}\n"
-                formatted_message += f"🚦 <strong>Status:</strong> {status}\n"
-                formatted_message += f"📝 <strong>Contract Result:</strong> {contract_ret}\n"
-                formatted_message += f"🧱 <strong>Block:</strong> {tx.get('block', 'N/A')}\n\n"
-        else:
-            formatted_message += "No recent transactions found for this wallet and token.\n"
-        
+    network = await user_network(update, context)
+    pager = network.transfer_pager
+    if pager is None:
+        await update.message.reply_text(f"Transfer history is not available on {network.name}.")
+        return
+    view_id = pager.open_view(wallet_address, token_address)
+    
+    try:
+        data = await pager.page(wallet_address, token_address, 0)
+    except TronscanError as e:
         await update.message.reply_text(
-            formatted_message,
+            f"Error fetching transaction data: {e}",
+            reply_markup=ReplyKeyboardRemove()
+        )
+        return
+    
+    has_next = pager.has_next(data, 0)
+    if has_next:
+        pager.prefetch(wallet_address, token_address, 1)
+    
+    await update.message.reply_text(
+        render_wallet_transfers_page(wallet_address, data, 0, pager.page_size, network.profile.explorer_url, network.name),
+        parse_mode="HTML",
+        reply_markup=transfers_keyboard(view_id, 0, has_next),
+        disable_web_page_preview=True
+    )
+
+def transfers_keyboard(view_id, page, has_next):
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton("◀️ Newer", callback_data=callback_data(view_id, page - 1)))
+    if has_next:
+        buttons.append(InlineKeyboardButton("Older ▶️", callback_data=callback_data(view_id, page + 1)))
+    return InlineKeyboardMarkup([buttons]) if buttons else None
+
+async def wallet_transfers_page(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show another page of a /getwallettransfers reply when a paging button is pressed."""
+    
+    query = update.callback_query
+    network = await user_network(update, context)
+    pager = network.transfer_pager
+    view_id, page = parse_callback_data(query.data)
+    
+    # Views live in the pager of the network they were opened on
+    view = pager.lookup(view_id) if pager is not None else None
+    if view is None:
+        await query.answer("This list has expired, run /getwallettransfers again.", show_alert=True)
+        return
+    wallet_address, token_address = view
+    
+    try:
+        data = await pager.page(wallet_address, token_address, page)
+    except TronscanError as e:
+        await query.answer(f"Error fetching transaction data: {e}", show_alert=True)
+        return
+    await query.answer()
+    
+    has_next = pager.has_next(data, page)
+    if has_next:
+        pager.prefetch(wallet_address, token_address, page + 1)
+    
+    try:
+        await query.edit_message_text(
+            render_wallet_transfers_page(wallet_address, data, page, pager.page_size, network.profile.explorer_url, network.name),
             parse_mode="HTML",
-            reply_markup=ReplyKeyboardRemove(),
+            reply_markup=transfers_keyboard(view_id, page, has_next),
             disable_web_page_preview=True
         )
+    except BadRequest as e:
+        # A double tap asks for the page that is already shown
+        if "not modified" not in str(e).lower():
+            raise
+
+async def watch(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    network = await user_network(update, context)
+    chat_id = update.effective_chat.id
+    
+    if not context.args:
+        watched = [
+            f"{address} ({other.name})"
+            for other in context.bot_data["networks"].values()
+            for address in other.watcher.watched(chat_id)
+        ]
+        if watched:
+            await update.message.reply_text("👀 Watching:\n" + "\n".join(watched))
+        else:
+            await update.message.reply_text("Usage: /watch <address>")
+        return
+    
+    address = context.args[0]
+    if not is_address(address):
+        await update.message.reply_text("Invalid address")
+        return
+    
+    try:
+        added = await network.watcher.subscribe(update.effective_user.id, chat_id, address)
+    except SubscriptionLimitReached as e:
+        await update.message.reply_text(str(e))
+        return
+    
+    if added:
+        await update.message.reply_text(f"👀 Watching {address} on {network.name}. You will be notified of its transfers.")
     else:
-        await update.message.reply_text(
-            f"Error fetching transaction data: {response.status_code}",
-            reply_markup=ReplyKeyboardRemove()
+        await update.message.reply_text(f"Already watching {address} on {network.name}.")
+
+async def unwatch(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    address = context.args[0] if context.args else None
+    removed = []
+    for network in context.bot_data["networks"].values():
+        for item in await network.watcher.unsubscribe(update.effective_chat.id, address):
+            removed.append(f"{item} ({network.name})")
+    
+    if not removed:
+        await update.message.reply_text("Not watching that address." if address else "Not watching any addresses.")
+    else:
+        await update.message.reply_text("Stopped watching:\n" + "\n".join(removed))
+
+async def alert(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    alerts = context.bot_data.get("price_alerts")
+    if alerts is None:
+        await update.message.reply_text("Price alerts are not available.")
+        return
+    chat_id = update.effective_chat.id
+    
+    if not context.args:
+        existing = alerts.alerts_for(chat_id)
+        if existing:
+            await update.message.reply_text("🔔 Price alerts:\n" + "\n".join(
+                f"#{item['id']} {item['token']} {item['direction']} ${item['threshold']}" for item in existing
+            ))
+        else:
+            await update.message.reply_text("Usage: /alert <token_address> above|below <price>")
+        return
+    
+    if len(context.args) != 3:
+        await update.message.reply_text("Usage: /alert <token_address> above|below <price>")
+        return
+    
+    token, direction, threshold = context.args[0], context.args[1].lower(), parse_threshold(context.args[2])
+    if not is_address(token):
+        await update.message.reply_text("Invalid token address")
+        return
+    if direction not in (ABOVE, BELOW) or threshold is None:
+        await update.message.reply_text("Usage: /alert <token_address> above|below <price>")
+        return
+    
+    try:
+        created = await alerts.add(update.effective_user.id, chat_id, token, direction, threshold)
+    except AlertLimitReached as e:
+        await update.message.reply_text(str(e))
+        return
+    
+    await update.message.reply_text(f"🔔 Alert #{created['id']} set: {token} {direction} ${threshold}")
+
+async def unalert(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if len(context.args) != 1 or not context.args[0].lstrip("#").isdigit():
+        await update.message.reply_text("Usage: /unalert <alert_id>")
+        return
+    
+    alert_id = int(context.args[0].lstrip("#"))
+    alerts = context.bot_data.get("price_alerts")
+    if alerts is not None and await alerts.remove(update.effective_chat.id, alert_id):
+        await update.message.reply_text(f"Alert #{alert_id} removed.")
+    else:
+        await update.message.reply_text(f"No alert #{alert_id} in this chat.")
+
+def is_admin(update: Update) -> bool:
+    # Key export/import hands out private keys, so it is limited to admins in a private chat
+    return update.effective_user.id in ADMIN_USER_IDS and update.effective_chat.type == "private"
+
+async def export_keys(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not is_admin(update):
+        return
+
+    what = context.args[0].lower() if context.args else "wallets"
+    if what not in ("wallets", "pool"):
+        await update.message.reply_text("Usage: /exportkeys [wallets|pool]")
+        return
+
+    data = await context.bot_data["key_pool"].export_csv(what)
+    await update.message.reply_document(
+        InputFile(data.encode(), filename=f"{what}.csv"),
+        caption=f"⚠️ {what}.csv contains private keys. Delete this message once it is stored safely.",
+    )
+
+async def import_keys(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not is_admin(update):
+        return
+
+    key_pool = context.bot_data["key_pool"]
+    try:
+        document = await update.message.document.get_file()
+        data = await document.download_as_bytearray()
+        added, rejected = await key_pool.import_csv(data.decode("utf-8-sig"))
+    except Exception as e:
+        await update.message.reply_text(f"Error importing keys: {e}")
+        return
+
+    await update.message.reply_text(f"🔑 Added {added} keys to the pool ({rejected} rejected, {key_pool.size} available).")
+
+def price_alert_notifier(application):
+    async def notify(chat_id, triggered):
+        # Queued behind interactive replies; the engine does not wait for delivery
+        application.create_task(
+            application.bot.send_message(
+                chat_id, render_price_alert(triggered), parse_mode="HTML", rate_limit_args=NOTIFICATION,
+            ),
+            name="price-alert",
+        )
+    return notify
+
+def watch_notifier(application, profile):
+    async def notify(chat_id, event):
+        # Queued behind interactive replies so the block follower never waits on Telegram
+        application.create_task(
+            application.bot.send_message(
+                chat_id, render_watch_event(event, profile.explorer_url), parse_mode="HTML", disable_web_page_preview=True,
+                rate_limit_args=NOTIFICATION,
+            ),
+            name="watch-notification",
+        )
+    return notify
+
+async def post_init(application: Application) -> None:
+    """Open the shared resources once the application starts."""
+    
+    application.bot_data["inbound_limiter"] = InboundRateLimiter(
+        rate=RATE_LIMIT_RATE,
+        capacity=RATE_LIMIT_CAPACITY,
+        costs=parse_command_costs(RATE_LIMIT_COSTS),
+    )
+    
+    wallet_store = WalletStore(WALLET_DB, pool_size=WALLET_DB_POOL_SIZE, address_cache_size=WALLET_ADDRESS_CACHE_SIZE)
+    await wallet_store.open()
+    application.bot_data["wallet_store"] = wallet_store
+    
+    if WALLET_MASTER_KEY:
+        cipher = KeyCipher(parse_master_key(WALLET_MASTER_KEY))
+    else:
+        cipher = KeyCipher()
+        logger.warning("WALLET_MASTER_KEY is not set, private keys are stored unencrypted.")
+    key_store = KeyStore(wallet_store, cipher, ttl=KEY_CACHE_TTL, cache_size=KEY_CACHE_SIZE)
+    application.bot_data["key_store"] = key_store
+    await key_store.encrypt_existing()
+    
+    key_pool = KeyPool(wallet_store, cipher, target=KEY_POOL_TARGET, low_water=KEY_POOL_LOW_WATER, batch_size=KEY_POOL_BATCH_SIZE)
+    application.bot_data["key_pool"] = key_pool
+    await key_pool.start()
+    
+    http_pool = HttpClientPool(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        timeout=HTTP_TIMEOUT,
+        connect_timeout=HTTP_CONNECT_TIMEOUT,
+        read_timeout=HTTP_READ_TIMEOUT,
+        http2=HTTP_HTTP2,
+    )
+    application.bot_data["http_pool"] = http_pool
+    
+    # Long-lived async clients on pooled connections so handlers overlap their network I/O
+    networks = {}
+    for name, profile in load_profiles(TRON_NETWORKS, os.environ).items():
+        provider = MultiEndpointProvider(
+            profile.endpoints,
+            http_pool,
+            api_keys=TRON_GRID_API_KEYS,
+            hedge_after=TRON_HEDGE_AFTER,
+            cooldown=TRON_ENDPOINT_COOLDOWN,
+            health_interval=TRON_HEALTH_INTERVAL,
+            name=name,
+        )
+        provider.start()
+        network = Network(profile, AsyncTron(provider, network=name))
+        networks[name] = network
+        
+        network.token_metadata = TokenMetadataCache(
+            wallet_store,
+            network.tron,
+            name,
+            ttl=TOKEN_METADATA_TTL,
+            cache_size=TOKEN_METADATA_CACHE_SIZE,
+            concurrency=TOKEN_METADATA_CONCURRENCY,
+        )
+        network.confirmations = ConfirmationTracker(
+            network.tron,
+            poll_interval=CONFIRMATION_POLL_INTERVAL,
+            timeout=CONFIRMATION_TIMEOUT,
+        )
+        network.account_resources = AccountResourceCache(network.tron, ttl=ACCOUNT_RESOURCES_TTL)
+        
+        if profile.tronscan_api_url:
+            tronscan_options = {"router_url": profile.swap_api_url} if profile.swap_api_url else {}
+            network.tronscan = TronscanClient(
+                http_pool.get(f"tronscan:{name}"),
+                base_url=profile.tronscan_api_url,
+                api_key=TRONSCAN_API_KEY,
+                timeout=TRONSCAN_TIMEOUT,
+                max_retries=TRONSCAN_MAX_RETRIES,
+                cache=TTLCache(maxsize=TRONSCAN_CACHE_SIZE),
+                cache_ttls={
+                    "token_trc20": TRONSCAN_TOKEN_TTL,
+                    "account_tokens": TRONSCAN_ACCOUNT_TOKENS_TTL,
+                    "transfers_with_status": TRONSCAN_TRANSFERS_TTL,
+                },
+                **tronscan_options,
+            )
+            network.portfolio = PortfolioCache(
+                network.tronscan,
+                page_size=PORTFOLIO_PAGE_SIZE,
+                concurrency=PORTFOLIO_CONCURRENCY,
+                max_pages=PORTFOLIO_MAX_PAGES,
+                ttl=PORTFOLIO_TTL,
+            )
+            network.transfer_pager = TransferPager(
+                network.tronscan,
+                page_size=TRANSFERS_PAGE_SIZE,
+                ttl=TRANSFERS_PAGE_TTL,
+                cache_size=TRANSFERS_PAGE_CACHE_SIZE,
+            )
+        
+        if profile.has_swaps:
+            network.swap_executor = SwapExecutor(
+                network.tron,
+                router_address=profile.router_address,
+                abi_file=SWAP_ROUTER_ABI_FILE.replace("{network}", name),
+                slippage_bps=SWAP_SLIPPAGE_BPS,
+                deadline=SWAP_DEADLINE,
+                fee_limit=SWAP_FEE_LIMIT,
+            )
+            try:
+                await network.swap_executor.load()
+            except Exception as e:
+                # Not fatal: the first /swap loads it instead
+                logger.warning("Error: '%s' occurred while loading the SunSwap router ABI on %s.", e, name)
+            network.swap_quoter = SwapQuoter(
+                network.tronscan,
+                ttl=SWAP_QUOTE_TTL,
+                precision=SWAP_QUOTE_PRECISION,
+            )
+    
+    application.bot_data["networks"] = networks
+    application.bot_data["network_selector"] = NetworkSelector(
+        wallet_store, networks, DEFAULT_NETWORK, cache_size=USER_NETWORK_CACHE_SIZE,
+    )
+    
+    journal = TransactionJournal(wallet_store, dedupe_window=TRANSFER_DEDUPE_WINDOW)
+    application.bot_data["journal"] = journal
+    
+    # Resume confirmation of transfers that were in flight when the process stopped
+    pending = await journal.pending()
+    for row in pending:
+        network = networks.get(row['network'])
+        if network is None:
+            logger.warning("Not resuming transfer %s: network %s is not enabled", row['txid'], row['network'])
+            continue
+        transfer_info = format_transfer_info(network.profile, row['sender'], row['receiver'], row['amount'], row['txid'])
+        network.confirmations.track(
+            row['txid'],
+            transfer_status_notifier(application.bot, journal, row['chat_id'], row['message_id'], transfer_info),
+            submitted_at=row['updated_at'],
+        )
+    if pending:
+        logger.info("Resuming confirmation of %d pending transfers", len(pending))
+    
+    for network in networks.values():
+        network.confirmations.start()
+    
+    for network in networks.values():
+        network.watcher = WalletWatcher(
+            wallet_store,
+            network.tron,
+            watch_notifier(application, network.profile),
+            network.name,
+            poll_interval=WATCH_POLL_INTERVAL,
+            batch_size=WATCH_BLOCK_BATCH,
+            max_lag=WATCH_MAX_LAG,
+            limit_per_chat=WATCH_LIMIT_PER_CHAT,
         )
+        await network.watcher.load()
+        network.watcher.start()
+    
+    # Prices only mean something on mainnet; test networks' tokens have no market
+    market_network = networks.get(MARKET_DATA_NETWORK, networks[DEFAULT_NETWORK])
+    application.bot_data["market_network"] = market_network
+    if market_network.tronscan is not None:
+        price_alerts = PriceAlertEngine(
+            wallet_store,
+            market_network.tronscan,
+            price_alert_notifier(application),
+            interval=PRICE_ALERT_INTERVAL,
+            concurrency=PRICE_ALERT_CONCURRENCY,
+            limit_per_chat=PRICE_ALERT_LIMIT_PER_CHAT,
+        )
+        application.bot_data["price_alerts"] = price_alerts
+        await price_alerts.load()
+        price_alerts.start()
+    else:
+        logger.warning("Price alerts are disabled: %s has no Tronscan API.", market_network.name)
+
+
+async def post_stop(application: Application) -> None:
+    """Stop the background workers before the bot shuts down."""
+    
+    networks = application.bot_data.get("networks", {})
+    for network in networks.values():
+        await network.confirmations.stop()
+    
+    for network in networks.values():
+        if network.watcher is not None:
+            await network.watcher.stop()
+    
+    price_alerts = application.bot_data.get("price_alerts")
+    if price_alerts is not None:
+        await price_alerts.stop()
+    
+    for network in networks.values():
+        if network.transfer_pager is not None:
+            await network.transfer_pager.close()
+    
+    key_pool = application.bot_data.get("key_pool")
+    if key_pool is not None:
+        await key_pool.stop()
+    
+    for network in networks.values():
+        await network.tron.provider.stop()
+
+
+async def post_shutdown(application: Application) -> None:
+    """Release the shared resources when the application stops."""
+    
+    # The Tron clients share the pooled HTTP clients, so closing the pool closes them
+    application.bot_data.pop("network_selector", None)
+    application.bot_data.pop("market_network", None)
+    networks = application.bot_data.pop("networks", {})
+    for name, network in networks.items():
+        logger.info("%s endpoint stats: %s", name, network.tron.provider.stats())
+        if network.tronscan is not None:
+            logger.info("%s Tronscan cache stats: %s", name, network.tronscan.cache_stats())
+        if network.transfer_pager is not None:
+            logger.info("%s transfer page cache stats: %s", name, network.transfer_pager.stats())
+    application.bot_data.pop("journal", None)
+    inbound_limiter = application.bot_data.pop("inbound_limiter", None)
+    if inbound_limiter is not None:
+        logger.info("Inbound rate limit stats: %s", inbound_limiter.stats())
+    application.bot_data.pop("price_alerts", None)
+    key_pool = application.bot_data.pop("key_pool", None)
+    if key_pool is not None:
+        logger.info("Key pool stats: %s", key_pool.stats())
+    key_store = application.bot_data.pop("key_store", None)
+    if key_store is not None:
+        logger.info("Unlocked key cache stats: %s", key_store.stats())
+        key_store.forget()
+    
+    http_pool = application.bot_data.pop("http_pool", None)
+    if http_pool is not None:
+        await http_pool.close()
+    
+    wallet_store = application.bot_data.pop("wallet_store", None)
+    if wallet_store is not None:
+        await wallet_store.close()
+
 
 def main() -> None:
     """Run the bot."""
     # Create the Application and pass it your bot's token.
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .concurrent_updates(PerUserUpdateProcessor(CONCURRENT_UPDATES))
+        .rate_limiter(SendQueue(
+            global_rate=SEND_GLOBAL_RATE,
+            private_rate=SEND_PRIVATE_CHAT_RATE,
+            group_rate=SEND_GROUP_CHAT_RATE,
+            burst=SEND_CHAT_BURST,
+            max_retries=SEND_MAX_RETRIES,
+        ))
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     
+    application.add_handler(TypeHandler(Update, rate_limit), group=-1)
     application.add_handler(CommandHandler("start", start_callback)) #complete
     application.add_handler(CommandHandler("wallet", generate_trx_address)) #complete
     application.add_handler(CommandHandler("balance", get_total_balance_in_trx)) #complete
     application.add_handler(CommandHandler("tokenbalance", get_token_balance)) #complete
     application.add_handler(CommandHandler("transfer", transfer_trx)) #complete
-    application.add_handler(CommandHandler("swap", swap)) #needs fixing
+    application.add_handler(CommandHandler("swap", swap))
+    application.add_handler(CommandHandler("quote", quote))
     application.add_handler(CommandHandler("getmemecoininfo", get_meme_coin_info)) #complete
     application.add_handler(CommandHandler("getwalletinfo", get_wallet_info)) #complete
     application.add_handler(CommandHandler("getwallettransfers", get_wallet_transfers)) #complete
+    application.add_handler(CommandHandler("watch", watch))
+    application.add_handler(CommandHandler("unwatch", unwatch))
+    application.add_handler(CommandHandler("alert", alert))
+    application.add_handler(CommandHandler("unalert", unalert))
+    application.add_handler(CommandHandler("network", select_network))
+    application.add_handler(CommandHandler("exportkeys", export_keys))
+    application.add_handler(MessageHandler(filters.Document.ALL & filters.CaptionRegex(r"^/importkeys"), import_keys))
+    application.add_handler(CallbackQueryHandler(wallet_transfers_page, pattern=f"^{CALLBACK_PREFIX}:"))
     
     # Run the bot until the user presses Ctrl-C
-    application.run_polling(allowed_updates=Update.ALL_TYPES, read_timeout=600, write_timeout=600, pool_timeout=600, connect_timeout=600, timeout=600)
+    if BOT_MODE == 'webhook':
+        if not WEBHOOK_URL:
+            raise ValueError("WEBHOOK_URL must be set when BOT_MODE=webhook")
+        
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET_TOKEN,
+            allowed_updates=Update.ALL_TYPES,
+        )
+    else:
+        application.run_polling(allowed_updates=Update.ALL_TYPES, read_timeout=600, write_timeout=600, pool_timeout=600, connect_timeout=600, timeout=600)
 
 if __name__ == '__main__':
   main()
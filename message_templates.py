@@ -0,0 +1,325 @@
+from datetime import datetime, timezone
+from decimal import ROUND_DOWN, Decimal
+from html import escape
+
+# Telegram rejects messages longer than this many characters.
+MAX_MESSAGE_LENGTH = 4096
+# Block explorer for links when the caller does not pass its network's.
+EXPLORER_URL = "https://tronscan.org"
+
+
+def _e(value):
+    """HTML-escape a field from an API response (or any other value) for Telegram."""
+
+    return escape(str(value))
+
+
+def split_message(blocks, limit=MAX_MESSAGE_LENGTH):
+    """Pack rendered blocks into as few messages as possible, each at most limit characters.
+
+    Blocks are only split when a single one is longer than limit, first on
+    line boundaries and then, for overlong lines, at the last space before
+    limit, so tags (which never span lines in these templates) stay balanced
+    and no tag or &entity; is ever cut in half.
+    """
+
+    messages = []
+    current = []
+    size = 0
+
+    for block in blocks:
+        pieces = [block] if len(block) <= limit else _split_block(block, limit)
+        for piece in pieces:
+            if size + len(piece) > limit and current:
+                messages.append("".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece)
+
+    if current:
+        messages.append("".join(current))
+    return messages
+
+
+def _split_block(block, limit):
+    pieces = []
+    current = []
+    size = 0
+
+    for line in block.splitlines(keepends=True):
+        while len(line) > limit:
+            cut = _cut_point(line, limit)
+            pieces.append(line[:cut])
+            line = line[cut:]
+        if size + len(line) > limit and current:
+            pieces.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+
+    if current:
+        pieces.append("".join(current))
+    return pieces
+
+
+def _cut_point(line, limit):
+    """Where to cut line so the first piece is at most limit characters and valid HTML on its own."""
+
+    head = line[:limit]
+    space = max(head.rfind(" "), head.rfind("\t"))
+    cut = space + 1 if space > 0 else limit
+
+    # Without a space to cut at, step back out of any tag or entity the cut lands in.
+    for opening, closing in (("&", ";"), ("<", ">")):
+        start = line.rfind(opening, 0, cut)
+        if start > 0 and line.find(closing, start, cut) == -1:
+            cut = start
+    return cut
+
+
+def format_timestamp(timestamp, milliseconds=False):
+    if timestamp in (None, "", "N/A"):
+        return "N/A"
+
+    seconds = int(timestamp) / 1000 if milliseconds else int(timestamp)
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+
+
+def _percent(value):
+    try:
+        return float(value) * 100
+    except (TypeError, ValueError):
+        return "N/A"
+
+
+def _short(address):
+    return f"{address[:8]}...{address[-8:]}"
+
+
+MEME_COIN_EMPTY = "\nNo tokens found for this address.\n"
+
+
+def render_meme_coin_info(address, data, explorer_url=EXPLORER_URL):
+    """Render a /token_trc20 response into one or more HTML messages."""
+
+    blocks = [
+        "🔐 <strong>Meme Coin Info</strong> 🔐\n\n"
+        f"📍 <strong>Address:</strong> \n <a href='{_e(explorer_url)}/#/token20/{_e(address)}'>{_e(address)}</a>\n"
+    ]
+    tokens = data.get('trc20_tokens', [])
+
+    if not tokens:
+        blocks.append(MEME_COIN_EMPTY)
+        return split_message(blocks)
+
+    for token in tokens:
+        get = token.get
+        market_info = get('market_info') or {}
+        home_page = _e(get('home_page', 'N/A'))
+        pair_url = _e(market_info.get('pairUrl', 'N/A'))
+        out = [f"""
+💰 <strong>Token Name:</strong> {_e(get('name', 'N/A'))}
+🔖 <strong>Symbol:</strong> {_e(str(get('symbol', 'N/A')).upper())}
+
+📈 <strong>Total Supply:</strong> {_e(get('total_supply', 'N/A'))} (with decimals: {_e(get('total_supply_with_decimals', 'N/A'))})
+
+📝 <strong>Description:</strong> {_e(get('token_desc', 'N/A'))}
+
+👥 <strong>Holders Count:</strong> {_e(get('holders_count', 'N/A'))}
+
+🔢 <strong>Total Transfers:</strong> {_e(get('transfer_num', 'N/A'))}
+🔄 <strong>Transfers in 24h:</strong> {_e(get('transfer24h', 'N/A'))}
+📉 <strong>Volume (24h):</strong> {_e(get('volume24h', 'N/A'))}
+
+💲 <strong>Price:</strong>
+TRX: {_e(market_info.get('priceInTrx', 'N/A'))}
+USD: {_e(market_info.get('priceInUsd', 'N/A'))}
+
+💧 <strong>Liquidity:</strong>
+{_e(market_info.get('liquidity', 'N/A'))}
+24h: ${_e(get('liquidity24h', 'N/A'))}
+24h Rate: ${_e(get('liquidity24h_rate', 'N/A'))}
+
+📊 <strong>JustSwap Volume (24h):</strong> {_e(get('justSwapVolume24h', 'N/A'))}
+Rate: {_percent(get('justSwapVolume24h_rate'))}%
+
+🕒 <strong>Issue Date:</strong> {_e(get('issue_time', 'N/A'))}
+
+
+🏠 <strong>Home Page:</strong> <a href="{home_page}">{home_page}</a>
+🏷️ <strong>Tags:</strong> {_e(get('greyTag', 'N/A'))},{_e(get('redTag', 'N/A'))},{_e(get('blueTag', 'N/A'))}
+📛 <strong>Public Tag:</strong> {_e(get('publicTag', 'N/A'))}
+
+📧 <strong>Email:</strong> {_e(get('email', 'N/A'))}
+💻 <strong>GitHub:</strong> {_e(get('git_hub', 'N/A'))}
+📄 <strong>White Paper:</strong> {_e(get('white_paper', 'N/A'))}
+
+🏠 <strong>Issue Address:</strong> {_e(get('issue_address', 'N/A'))}
+
+📈 <strong>Gain:</strong> {_percent(market_info.get('gain'))}%
+🔗 <strong>Pair URL:</strong> <a href="{pair_url}">{pair_url}</a>
+"""]
+
+        social_media_list = get('social_media_list') or []
+        if social_media_list:
+            out.append("\n📱 <strong>Social Media Links:</strong>\n")
+            for platform in social_media_list:
+                url = _e(str(platform.get('url', 'N/A')).strip('[]""'))  # Clean up the URL format
+                out.append(f"   • {_e(platform.get('name', 'N/A'))}: <a href='{url}'>{url}</a>\n")
+
+        token_price_line = (get('tokenPriceLine') or {}).get('data', [])
+        if token_price_line:
+            out.append("\n📊 <strong>Price Over Time (USD):</strong>\n")
+            for price_point in token_price_line[:5]:  # Limit to 5 most recent data points
+                out.append(f"   • {format_timestamp(price_point.get('time'))}: {_e(price_point.get('priceUsd', 'N/A'))} USD\n")
+
+        out.append(f"\n🖼️ <strong>Icon:</strong> <a href='{_e(get('icon_url', 'N/A'))}'>View Icon</a>\n")
+        blocks.append("".join(out))
+
+    return split_message(blocks)
+
+
+def render_wallet_info(address, tokens, total=None, count=None, network=None):
+    """Render a list of /account/tokens holdings into one or more HTML messages.
+
+    total overrides the sum of the rendered holdings' USD values, and count
+    is the number of holdings the account has if only some are rendered.
+    network, if given, names the network the holdings were read from.
+    """
+
+    blocks = [f"🔐 <strong>Wallet Info for {_e(address)}</strong> 🔐\n\n" + _network_line(network)]
+
+    if not tokens:
+        blocks.append("No tokens found in this wallet.\n")
+        return split_message(blocks)
+
+    blocks.append("<strong>Token Holdings:</strong>\n\n")
+    total_value_usd = 0
+
+    for token in tokens:
+        get = token.get
+        abbr = _e(str(get('tokenAbbr', 'N/A')).upper())
+        balance = float(get('balance', 0)) / 10 ** int(get('tokenDecimal', 6))
+        price_usd = float(get('tokenPriceInUsd') or 0)
+        amount_usd = float(get('amountInUsd') or 0)
+        total_value_usd += amount_usd
+
+        out = [
+            f"🪙 <strong>{_e(str(get('tokenName', 'N/A')).upper())} ({abbr})</strong>\n"
+            f"   Balance: {balance:,.6f} {abbr}\n"
+            f"   Type: {_e(str(get('tokenType', 'N/A')).upper())}\n"
+        ]
+        if price_usd:
+            out.append(f"   Price: ${price_usd:.6f} USD / {float(get('tokenPriceInTrx') or 0):.6f} TRX\n")
+        if amount_usd:
+            out.append(f"   Value: ${amount_usd:.2f} USD\n")
+        out.append("\n")
+        blocks.append("".join(out))
+
+    blocks.append(f"💰 <strong>Total Portfolio Value:</strong> ${total_value_usd if total is None else total:.2f} USD\n\n")
+    if count is not None and count > len(tokens):
+        blocks.append(f"Showing {len(tokens)} of {count} tokens.\n")
+    return split_message(blocks)
+
+
+def render_wallet_transfers_page(address, data, page, page_size, explorer_url=EXPLORER_URL, network=None):
+    """Render one page of transfers as a single HTML message, for editing in place."""
+
+    blocks = _transfer_blocks(address, data, explorer_url, network)
+    count = len(data.get('data', []))
+    if count:
+        total = data.get('total')
+        first = page * page_size + 1
+        last = page * page_size + count
+        blocks.append(f"📄 Page {page + 1} · transactions {first}-{last}{f' of {_e(total)}' if total is not None else ''}\n")
+    # Page sizes are capped so a page fits; never send more than one message.
+    return split_message(blocks)[0]
+
+
+def _network_line(network):
+    return f"🌐 <strong>Network:</strong> {_e(network)}\n\n" if network else ""
+
+
+def _transfer_blocks(address, data, explorer_url, network=None):
+    token_info = data.get('tokenInfo') or {}
+    token_abbr = _e(token_info.get('tokenAbbr', 'N/A'))
+    explorer_url = _e(explorer_url)
+    blocks = [
+        f"🔐 <strong>Recent Transactions for {_e(address)}</strong> 🔐\n\n"
+        f"🪙 <strong>Token:</strong> {_e(token_info.get('tokenName', 'N/A'))} ({token_abbr})\n"
+        f"📍 <strong>Token Address:</strong> {_e(token_info.get('tokenId', 'N/A'))}\n"
+        f"🏭 <strong>Issuer:</strong> {_e(token_info.get('issuerAddr', 'N/A'))}\n\n"
+        + _network_line(network)
+    ]
+
+    transactions = data.get('data', [])
+    if not transactions:
+        blocks.append("No recent transactions found for this wallet and token.\n")
+        return blocks
+
+    for tx in transactions:
+        get = tx.get
+        tx_hash = str(get('hash', 'N/A'))
+        amount = float(get('amount', 0)) / 10 ** int(get('decimals', 18))
+        blocks.append(
+            f"📊 <strong>Transaction:</strong> <a href='{explorer_url}/#/transaction/{_e(tx_hash)}'>{_e(_short(tx_hash))}</a>\n"
+            f"⏰ <strong>Time:</strong> {format_timestamp(get('block_timestamp'), milliseconds=True)}\n"
+            f"📤 <strong>From:</strong> {_e(_short(str(get('from', 'N/A'))))}\n"
+            f"📥 <strong>To:</strong> {_e(_short(str(get('to', 'N/A'))))}\n"
+            f"💰 <strong>Amount:</strong> {amount:,.6f} {token_abbr}\n"
+            f"🚦 <strong>Status:</strong> {_e(get('final_result', 'N/A'))}\n"
+            f"📝 <strong>Contract Result:</strong> {_e(get('contract_ret', 'N/A'))}\n"
+            f"🧱 <strong>Block:</strong> {_e(get('block', 'N/A'))}\n\n"
+        )
+
+    return blocks
+
+
+def render_watch_event(event, explorer_url=EXPLORER_URL):
+    """Render a WalletWatcher transfer event as one HTML message."""
+
+    if event['token'] is None:
+        amount = f"{event['amount'] / 10 ** 6:,.6f} TRX"
+    else:
+        # Token decimals are not in the block, so show raw units and the token id.
+        amount = f"{event['amount']} units of {event['token']}"
+
+    direction = "Incoming transfer" if event['direction'] == "to" else "Outgoing transfer"
+    return (
+        f"👀 <strong>{direction} for {_e(event['watched'])}</strong>\n\n"
+        f"💸 <strong>Amount:</strong> {_e(amount)}\n"
+        f"📤 <strong>From:</strong> {_e(event['from'] or 'N/A')}\n"
+        f"📥 <strong>To:</strong> {_e(event['to'] or 'N/A')}\n"
+        f"🚦 <strong>Status:</strong> {_e(event['status'])}\n"
+        f"🧱 <strong>Block:</strong> {_e(event['block'])}\n"
+        f"📝 <a href='{_e(explorer_url)}/#/transaction/{_e(event['txid'])}'>View transaction</a>\n"
+    )
+
+
+def render_price_alert(alert):
+    """Render a triggered PriceAlertEngine alert as one HTML message."""
+
+    return (
+        "🔔 <strong>Price alert</strong>\n\n"
+        f"🪙 <strong>Token:</strong> {_e(alert['token'])}\n"
+        f"📈 <strong>Price:</strong> ${_e(alert['price'])} USD, {_e(alert['direction'])} your ${_e(alert['threshold'])} alert\n"
+    )
+
+
+def render_swap_quote(amount, quote):
+    """Render a SwapQuoter result for amount (as the user typed it) as one HTML message."""
+
+    symbols = quote.get('symbols') or quote.get('tokens') or []
+    amount_out = quote['amountOut'].quantize(Decimal('0.000001'), rounding=ROUND_DOWN)
+    route = " → ".join(str(symbol) for symbol in symbols) or 'N/A'
+    pools = ", ".join(str(version) for version in quote.get('poolVersions') or []) or 'N/A'
+    return (
+        "💱 <strong>Swap Quote</strong> 💱\n\n"
+        f"📤 <strong>You pay:</strong> {_e(amount)} {_e(symbols[0] if symbols else 'N/A')}\n"
+        f"📥 <strong>You get:</strong> ~{amount_out:f} {_e(symbols[-1] if symbols else 'N/A')}\n"
+        f"🛣️ <strong>Route:</strong> {_e(route)}\n"
+        f"🏊 <strong>Pools:</strong> {_e(pools)}\n"
+        f"📉 <strong>Price impact:</strong> {_e(quote.get('impact', 'N/A'))}\n"
+        f"💰 <strong>Fee:</strong> {_e(quote.get('fee', 'N/A'))}\n"
+        f"🔎 <strong>Routes compared:</strong> {_e(quote.get('routes', 1))}\n"
+    )
@@ -0,0 +1,164 @@
+import logging
+import time
+
+from tronpy.defaults import CONF_MAINNET, CONF_NILE, CONF_SHASTA
+
+from caching import LRUCache
+from swap_executor import SUNSWAP_ROUTER_ADDRESS
+from tronscan import SUNSWAP_ROUTER_URL, TRONSCAN_API_URL
+
+logger = logging.getLogger(__name__)
+
+SELECT_USER_NETWORK_SQL = "SELECT network FROM user_networks WHERE user_id=?;"
+UPSERT_USER_NETWORK_SQL = """INSERT INTO user_networks(user_id, network, updated_at)
+                             VALUES(?,?,?)
+                             ON CONFLICT(user_id) DO UPDATE SET
+                                 network=excluded.network,
+                                 updated_at=excluded.updated_at"""
+
+
+class NetworkProfile:
+    """Everything that differs between TRON networks: nodes, explorer, APIs and contracts.
+
+    tronscan_api_url, router_address and swap_api_url are None on networks
+    without a Tronscan API or a SunSwap deployment; the features needing
+    them are then unavailable there.
+    """
+
+    __slots__ = ("name", "endpoints", "explorer_url", "tronscan_api_url", "router_address", "swap_api_url")
+
+    def __init__(self, name, endpoints, explorer_url, tronscan_api_url=None, router_address=None, swap_api_url=None):
+        self.name = name
+        self.endpoints = list(endpoints)
+        self.explorer_url = explorer_url.rstrip("/")
+        self.tronscan_api_url = tronscan_api_url
+        self.router_address = router_address
+        self.swap_api_url = swap_api_url
+
+    @property
+    def has_swaps(self):
+        return bool(self.tronscan_api_url and self.router_address and self.swap_api_url)
+
+    def tx_url(self, txid):
+        return f"{self.explorer_url}/#/transaction/{txid}"
+
+    def __repr__(self):
+        return f"NetworkProfile({self.name!r}, endpoints={self.endpoints!r})"
+
+
+PROFILES = {
+    "mainnet": NetworkProfile(
+        "mainnet", [CONF_MAINNET["fullnode"]], "https://tronscan.org",
+        tronscan_api_url=TRONSCAN_API_URL, router_address=SUNSWAP_ROUTER_ADDRESS, swap_api_url=SUNSWAP_ROUTER_URL,
+    ),
+    "nile": NetworkProfile(
+        "nile", [CONF_NILE["fullnode"]], "https://nile.tronscan.org",
+        tronscan_api_url="https://nileapi.tronscan.org/api",
+    ),
+    "shasta": NetworkProfile(
+        "shasta", [CONF_SHASTA["fullnode"]], "https://shasta.tronscan.org",
+        tronscan_api_url="https://shastapi.tronscan.org/api",
+    ),
+}
+
+
+def load_profiles(names, environ):
+    """Build the profiles for names, applying TRON_<NAME>_* overrides from environ.
+
+    TRON_<NAME>_ENDPOINTS (comma-separated), TRON_<NAME>_EXPLORER_URL,
+    TRON_<NAME>_TRONSCAN_API_URL, TRON_<NAME>_ROUTER and
+    TRON_<NAME>_SWAP_API_URL replace the built-in values; setting one of the
+    last three to an empty value turns its feature off. A name without a
+    built-in profile needs at least ENDPOINTS and EXPLORER_URL.
+    """
+
+    profiles = {}
+    for name in names:
+        base = PROFILES.get(name)
+        prefix = f"TRON_{name.upper()}_"
+        endpoints = environ.get(prefix + "ENDPOINTS")
+        endpoints = [url.strip() for url in endpoints.split(",") if url.strip()] if endpoints else None
+        explorer_url = environ.get(prefix + "EXPLORER_URL")
+
+        if base is None and not (endpoints and explorer_url):
+            raise ValueError(f"Unknown network {name!r}: set {prefix}ENDPOINTS and {prefix}EXPLORER_URL")
+
+        profiles[name] = NetworkProfile(
+            name,
+            endpoints or base.endpoints,
+            explorer_url or base.explorer_url,
+            tronscan_api_url=environ.get(prefix + "TRONSCAN_API_URL", base.tronscan_api_url if base else None) or None,
+            router_address=environ.get(prefix + "ROUTER", base.router_address if base else None) or None,
+            swap_api_url=environ.get(prefix + "SWAP_API_URL", base.swap_api_url if base else None) or None,
+        )
+    return profiles
+
+
+class Network:
+    """A profile and the long-lived clients and caches the handlers use on that network.
+
+    Built once in post_init; attributes for features the profile does not
+    support (tronscan, swap_executor, ...) stay None.
+    """
+
+    def __init__(self, profile, tron):
+        self.profile = profile
+        self.tron = tron
+        self.tronscan = None
+        self.confirmations = None
+        self.account_resources = None
+        self.token_metadata = None
+        self.swap_executor = None
+        self.swap_quoter = None
+        self.portfolio = None
+        self.transfer_pager = None
+        self.watcher = None
+
+    @property
+    def name(self):
+        return self.profile.name
+
+
+class NetworkSelector:
+    """Which network each user is on, stored in the wallet database.
+
+    Users who never chose one are on the default network. Choices are kept
+    in an LRU in front of SQLite, since every network-bound command asks.
+    """
+
+    def __init__(self, wallet_store, networks, default, cache_size=10_000):
+        if default not in networks:
+            raise ValueError(f"Default network {default!r} is not enabled")
+
+        self.wallet_store = wallet_store
+        self.networks = networks
+        self.default = default
+        self._choices = LRUCache(cache_size)
+
+    async def get(self, user_id):
+        """Return the Network user_id is on."""
+
+        name = self._choices.get(user_id)
+        if name is None:
+            async with self.wallet_store.connection() as conn:
+                async with conn.execute(SELECT_USER_NETWORK_SQL, (user_id,)) as cursor:
+                    row = await cursor.fetchone()
+            name = row[0] if row is not None else self.default
+            self._choices.set(user_id, name)
+
+        network = self.networks.get(name)
+        if network is None:
+            # The stored network has been disabled since it was chosen.
+            return self.networks[self.default]
+        return network
+
+    async def set(self, user_id, name):
+        if name not in self.networks:
+            raise KeyError(name)
+
+        async with self.wallet_store.connection() as conn:
+            await conn.execute(UPSERT_USER_NETWORK_SQL, (user_id, name, time.time()))
+            await conn.commit()
+
+        self._choices.set(user_id, name)
+        return self.networks[name]
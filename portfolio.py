@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from decimal import Decimal, InvalidOperation
+
+from caching import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Tronscan caps /account/tokens at this many rows per request.
+MAX_PAGE_SIZE = 200
+
+
+class PortfolioCache:
+    """Every token holding of an address, merged from all /account/tokens pages.
+
+    The first page tells us the total, then the remaining pages are fetched
+    concurrently (at most concurrency at a time). Holdings are sorted by USD
+    value and totalled with Decimal, and the aggregate is cached per address
+    for ttl seconds; concurrent /getwalletinfo calls share a single load.
+    """
+
+    def __init__(self, tronscan, page_size=MAX_PAGE_SIZE, concurrency=4, max_pages=25, ttl=30.0, cache_size=1024):
+        self.tronscan = tronscan
+        self.page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        self.concurrency = max(1, int(concurrency))
+        self.max_pages = max(1, int(max_pages))
+        self._cache = TTLCache(maxsize=cache_size, ttl=ttl)
+
+    async def get(self, address):
+        """Return {"tokens", "total_usd", "count", "complete"} for address."""
+
+        return await self._cache.get_or_load(address, lambda: self._load(address))
+
+    def invalidate(self, address):
+        self._cache.pop(address)
+
+    def stats(self):
+        return self._cache.stats()
+
+    async def _load(self, address):
+        first = await self.tronscan.account_tokens(address, start=0, limit=self.page_size)
+        total = int(first.get('total') or 0)
+        pages = min(-(-total // self.page_size), self.max_pages)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(page):
+            async with semaphore:
+                return await self.tronscan.account_tokens(address, start=page * self.page_size, limit=self.page_size)
+
+        rest = await asyncio.gather(*(fetch(page) for page in range(1, pages)))
+
+        # Holdings can move between pages while they are read; keep the first copy of each token.
+        tokens = {}
+        for data in (first, *rest):
+            for token in data.get('data', []):
+                tokens.setdefault((token.get('tokenId'), token.get('tokenType')), token)
+
+        holdings = sorted(tokens.values(), key=lambda token: _decimal(token.get('amountInUsd')), reverse=True)
+        if total > pages * self.page_size:
+            logger.info("Portfolio of %s truncated to %d of %d tokens", address, len(holdings), total)
+
+        return {
+            "tokens": holdings,
+            "total_usd": sum((_decimal(token.get('amountInUsd')) for token in holdings), Decimal(0)),
+            "count": max(total, len(holdings)),
+            "complete": total <= pages * self.page_size,
+        }
+
+
+def _decimal(value):
+    try:
+        value = Decimal(str(value or 0))
+    except InvalidOperation:
+        return Decimal(0)
+    return value if value.is_finite() else Decimal(0)
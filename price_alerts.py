@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import math
+import time
+from bisect import bisect_left, bisect_right, insort
+from decimal import Decimal, InvalidOperation
+
+logger = logging.getLogger(__name__)
+
+ABOVE = "above"
+BELOW = "below"
+
+INSERT_ALERT_SQL = """INSERT INTO price_alerts(user_id, chat_id, token, direction, threshold, created_at)
+                      VALUES(?,?,?,?,?,?)"""
+SELECT_ALERTS_SQL = "SELECT id, chat_id, token, direction, threshold FROM price_alerts;"
+DELETE_ALERTS_SQL = "DELETE FROM price_alerts WHERE id IN ({});"
+
+
+class AlertLimitReached(Exception):
+    """Raised when a chat already has the maximum number of price alerts."""
+
+
+class _Thresholds:
+    """The alerts on one token, kept sorted so a price update only touches the ones it crosses."""
+
+    __slots__ = ("above", "below")
+
+    def __init__(self):
+        self.above = []
+        self.below = []
+
+    def __len__(self):
+        return len(self.above) + len(self.below)
+
+    def add(self, direction, threshold, alert_id):
+        insort(self.above if direction == ABOVE else self.below, (threshold, alert_id))
+
+    def remove(self, direction, threshold, alert_id):
+        entries = self.above if direction == ABOVE else self.below
+        index = bisect_left(entries, (threshold, alert_id))
+        if index < len(entries) and entries[index] == (threshold, alert_id):
+            del entries[index]
+
+    def crossed(self, price):
+        """Remove and return the ids of every alert that price triggers."""
+
+        # "above" alerts with threshold <= price are a prefix, "below" alerts with threshold >= price a suffix.
+        above = bisect_right(self.above, (price, math.inf))
+        below = bisect_left(self.below, (price, -math.inf))
+
+        triggered = [alert_id for _threshold, alert_id in self.above[:above]]
+        triggered += [alert_id for _threshold, alert_id in self.below[below:]]
+        del self.above[:above]
+        del self.below[below:]
+        return triggered
+
+
+class PriceAlertEngine:
+    """One-shot /alert price alerts on TRC20 tokens, checked on a fixed tick.
+
+    Alerts are stored in the wallet database and indexed in memory per token
+    in sorted threshold lists. Each tick fetches the price of every alerted
+    token once, however many alerts it has, with bounded concurrency, and
+    bisects each token's lists so only the crossed alerts are touched.
+    Triggered alerts are deleted and handed to the async notify(chat_id, alert)
+    callback.
+    """
+
+    def __init__(self, wallet_store, tronscan, notify, interval=60.0, concurrency=4, limit_per_chat=20):
+        self.wallet_store = wallet_store
+        self.tronscan = tronscan
+        self.notify = notify
+        self.interval = interval
+        self.concurrency = max(1, int(concurrency))
+        self.limit_per_chat = limit_per_chat
+        self._alerts = {}
+        self._by_token = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def load(self):
+        """Read every stored alert into the in-memory index."""
+
+        async with self.wallet_store.connection() as conn:
+            async with conn.execute(SELECT_ALERTS_SQL) as cursor:
+                rows = await cursor.fetchall()
+
+        for alert_id, chat_id, token, direction, threshold in rows:
+            self._add({"id": alert_id, "chat_id": chat_id, "token": token,
+                       "direction": direction, "threshold": Decimal(threshold)})
+        return len(rows)
+
+    async def add(self, user_id, chat_id, token, direction, threshold):
+        """Store a new alert and return it as a dict."""
+
+        if direction not in (ABOVE, BELOW):
+            raise ValueError(f"Direction must be '{ABOVE}' or '{BELOW}'.")
+        if len(self.alerts_for(chat_id)) >= self.limit_per_chat:
+            raise AlertLimitReached(f"A chat can have at most {self.limit_per_chat} price alerts.")
+
+        async with self.wallet_store.connection() as conn:
+            cursor = await conn.execute(INSERT_ALERT_SQL, (
+                user_id, chat_id, token, direction, str(threshold), time.time(),
+            ))
+            alert_id = cursor.lastrowid
+            await cursor.close()
+            await conn.commit()
+
+        alert = {"id": alert_id, "chat_id": chat_id, "token": token, "direction": direction, "threshold": threshold}
+        self._add(alert)
+        self._wakeup.set()
+        return alert
+
+    async def remove(self, chat_id, alert_id):
+        """Delete one of chat_id's alerts; return False if it has no such alert."""
+
+        alert = self._alerts.get(alert_id)
+        if alert is None or alert["chat_id"] != chat_id:
+            return False
+
+        await self._delete([alert_id])
+        self._discard(alert)
+        return True
+
+    def alerts_for(self, chat_id):
+        return sorted(
+            (alert for alert in self._alerts.values() if alert["chat_id"] == chat_id),
+            key=lambda alert: alert["id"],
+        )
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="price-alerts")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self):
+        return {"alerts": len(self._alerts), "tokens": len(self._by_token)}
+
+    def _add(self, alert):
+        self._alerts[alert["id"]] = alert
+        thresholds = self._by_token.get(alert["token"])
+        if thresholds is None:
+            thresholds = self._by_token[alert["token"]] = _Thresholds()
+        thresholds.add(alert["direction"], alert["threshold"], alert["id"])
+
+    def _discard(self, alert):
+        self._alerts.pop(alert["id"], None)
+        thresholds = self._by_token.get(alert["token"])
+        if thresholds is not None:
+            thresholds.remove(alert["direction"], alert["threshold"], alert["id"])
+            if not thresholds:
+                del self._by_token[alert["token"]]
+
+    async def _delete(self, alert_ids):
+        async with self.wallet_store.connection() as conn:
+            await conn.execute(DELETE_ALERTS_SQL.format(",".join("?" * len(alert_ids))), alert_ids)
+            await conn.commit()
+
+    async def _run(self):
+        while True:
+            if not self._by_token:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            try:
+                await self._tick()
+            except Exception:
+                logger.exception("Error while checking price alerts")
+
+            await asyncio.sleep(self.interval)
+
+    async def _tick(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tokens = list(self._by_token)
+
+        async def price(token):
+            async with semaphore:
+                try:
+                    return token, _price_in_usd(await self.tronscan.token_trc20(token))
+                except Exception as e:
+                    logger.warning("Error: '%s' occurred while reading the price of %s.", e, token)
+                    return token, None
+
+        triggered = []
+        for token, usd in await asyncio.gather(*(price(token) for token in tokens)):
+            thresholds = self._by_token.get(token)
+            if usd is None or thresholds is None:
+                continue
+            for alert_id in thresholds.crossed(usd):
+                triggered.append((self._alerts.pop(alert_id), usd))
+            if not thresholds:
+                del self._by_token[token]
+
+        if not triggered:
+            return
+
+        await self._delete([alert["id"] for alert, _usd in triggered])
+        for alert, usd in triggered:
+            try:
+                await self.notify(alert["chat_id"], {**alert, "price": usd})
+            except Exception:
+                logger.exception("Error while delivering price alert %s", alert["id"])
+
+
+def parse_threshold(text):
+    """Parse a positive price, or return None."""
+
+    try:
+        value = Decimal(text.lstrip("$"))
+    except InvalidOperation:
+        return None
+    return value if value.is_finite() and value > 0 else None
+
+
+def _price_in_usd(data):
+    tokens = data.get('trc20_tokens') or []
+    if not tokens:
+        return None
+
+    market_info = tokens[0].get('market_info') or {}
+    price = market_info.get('priceInUsd')
+    if price is None:
+        return None
+    try:
+        price = Decimal(str(price))
+    except InvalidOperation:
+        return None
+    return price if price.is_finite() else None
@@ -0,0 +1,261 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from caching import LRUCache
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NOTIFICATION = 1
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_NOTIFICATION)
+
+# Pass as rate_limit_args= on bot calls that are not a reply to the user.
+NOTIFICATION = {"priority": PRIORITY_NOTIFICATION}
+
+
+class TokenBucket:
+    """rate tokens per second, up to capacity, optionally blocked until a point in time."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.blocked_until = 0.0
+
+    def delay(self, now, cost=1):
+        """Seconds until cost tokens are available (0 if they are available now)."""
+
+        self._refill(now)
+        wait = 0.0 if self.tokens >= cost else (cost - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def take(self, now, cost=1):
+        self._refill(now)
+        self.tokens -= cost
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class SendQueue(BaseRateLimiter):
+    """Outbound scheduler for every Bot API call the application makes.
+
+    Installed with ApplicationBuilder.rate_limiter(), so reply_text, edits and
+    background notifications all pass through it without changes to the
+    handlers. A call waits until the global bucket (Telegram's ~30 msg/s)
+    and its chat's bucket (about 1 msg/s in private chats, 20 per minute in
+    groups) both have a token. Calls for one chat go out one at a time and
+    in order, and interactive calls are granted ahead of ones made with
+    rate_limit_args=NOTIFICATION. A RetryAfter pauses only the chat it came
+    from before the call is retried.
+    """
+
+    __slots__ = (
+        "global_rate", "private_rate", "group_rate", "burst", "max_retries", "clock",
+        "_global", "_chat_buckets", "_waiters", "_busy", "_scheduled", "_ready", "_delayed",
+        "_seq", "_wakeup", "_task", "sent", "retried", "max_wait", "_total_wait",
+    )
+
+    def __init__(self, global_rate=30.0, private_rate=1.0, group_rate=20 / 60, burst=3, max_retries=3,
+                 chat_cache_size=10_000, clock=time.monotonic):
+        self.global_rate = global_rate
+        self.private_rate = private_rate
+        self.group_rate = group_rate
+        self.burst = max(1, burst)
+        self.max_retries = max_retries
+        self.clock = clock
+        self._global = TokenBucket(global_rate, max(1.0, global_rate), clock())
+        self._chat_buckets = LRUCache(chat_cache_size)
+        self._waiters = {}
+        self._busy = set()
+        self._scheduled = set()
+        self._ready = {priority: deque() for priority in PRIORITIES}
+        self._delayed = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.sent = 0
+        self.retried = 0
+        self.max_wait = 0.0
+        self._total_wait = 0.0
+
+    async def initialize(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._dispatch(), name="send-queue")
+
+    async def shutdown(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        logger.info("Send queue stats: %s", self.stats())
+        for waiters in self._waiters.values():
+            for _priority, _seq, _queued_at, future in waiters:
+                if not future.done():
+                    future.set_exception(RuntimeError("Send queue shut down"))
+        self._waiters.clear()
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id")
+        priority = (rate_limit_args or {}).get("priority", PRIORITY_INTERACTIVE)
+        if priority not in self._ready:
+            priority = PRIORITY_NOTIFICATION
+
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(chat_id, priority)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if attempt >= self.max_retries:
+                    raise
+                retry_after = _seconds(e.retry_after)
+                logger.warning("Flood limit on %s for chat %s, retrying in %.1fs", endpoint, chat_id, retry_after)
+                self.retried += 1
+                self._block_chat(chat_id, retry_after)
+            finally:
+                self._release(chat_id)
+
+    def stats(self):
+        queued = {priority: 0 for priority in PRIORITIES}
+        for waiters in self._waiters.values():
+            for priority, _seq, _queued_at, future in waiters:
+                if not future.done():
+                    queued[priority] = queued.get(priority, 0) + 1
+
+        return {
+            "queued_interactive": queued[PRIORITY_INTERACTIVE],
+            "queued_notifications": queued[PRIORITY_NOTIFICATION],
+            "in_flight_chats": len(self._busy),
+            "sent": self.sent,
+            "retried": self.retried,
+            "avg_wait": self._total_wait / self.sent if self.sent else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+    async def _acquire(self, chat_id, priority):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters.setdefault(chat_id, []), (priority, next(self._seq), self.clock(), future))
+        self._schedule(chat_id)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted just as the caller went away: hand the chat to the next call.
+            if future.done() and not future.cancelled():
+                self._release(chat_id)
+            raise
+
+    def _release(self, chat_id):
+        self._busy.discard(chat_id)
+        self._schedule(chat_id)
+
+    def _block_chat(self, chat_id, seconds):
+        bucket = self._bucket(chat_id)
+        if bucket is not None:
+            bucket.blocked_until = max(bucket.blocked_until, self.clock() + seconds)
+
+    def _bucket(self, chat_id):
+        if chat_id is None:
+            return None
+
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            is_group = not isinstance(chat_id, int) or chat_id < 0
+            bucket = TokenBucket(self.group_rate if is_group else self.private_rate, self.burst, self.clock())
+            self._chat_buckets.set(chat_id, bucket)
+        return bucket
+
+    def _schedule(self, chat_id):
+        """Queue chat_id for the dispatcher if it has a waiting call and nothing in flight."""
+
+        waiters = self._waiters.get(chat_id)
+        if not waiters:
+            self._waiters.pop(chat_id, None)
+            return
+        if chat_id in self._busy or chat_id in self._scheduled:
+            return
+
+        now = self.clock()
+        bucket = self._bucket(chat_id)
+        delay = bucket.delay(now) if bucket is not None else 0.0
+
+        self._scheduled.add(chat_id)
+        if delay > 0:
+            heapq.heappush(self._delayed, (now + delay, next(self._seq), chat_id))
+        else:
+            self._ready[waiters[0][0]].append(chat_id)
+        self._wakeup.set()
+
+    def _next_ready(self):
+        for priority in PRIORITIES:
+            if self._ready[priority]:
+                return self._ready[priority]
+        return None
+
+    async def _dispatch(self):
+        while True:
+            now = self.clock()
+            while self._delayed and self._delayed[0][0] <= now:
+                _ready_at, _seq, chat_id = heapq.heappop(self._delayed)
+                self._scheduled.discard(chat_id)
+                self._schedule(chat_id)
+
+            lane = self._next_ready()
+            if lane is None:
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            delay = self._global.delay(now)
+            if delay > 0:
+                # Re-pick afterwards: an interactive call may have arrived meanwhile.
+                await asyncio.sleep(delay)
+                continue
+
+            chat_id = lane.popleft()
+            self._scheduled.discard(chat_id)
+            _priority, _seq, queued_at, future = heapq.heappop(self._waiters[chat_id])
+            if future.done():
+                # The caller was cancelled while waiting.
+                self._schedule(chat_id)
+                continue
+
+            self._global.take(now)
+            bucket = self._bucket(chat_id)
+            if bucket is not None:
+                bucket.take(now)
+                self._busy.add(chat_id)
+
+            wait = now - queued_at
+            self.sent += 1
+            self._total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            future.set_result(None)
+
+            if chat_id is None:
+                self._schedule(chat_id)
+
+
+def _seconds(value):
+    return value.total_seconds() if hasattr(value, "total_seconds") else float(value)
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from decimal import ROUND_DOWN, Decimal
+
+from tronpy.async_contract import AsyncContract
+from tronpy.keys import to_hex_address
+
+from caching import LRUCache, TTLCache
+from tronscan import SUNSWAP_TRX_ADDRESS
+
+try:
+    from tronpy import proto
+except ImportError:
+    proto = None
+
+logger = logging.getLogger(__name__)
+
+SUNSWAP_ROUTER_ADDRESS = "TFVisXFaijZfeyeSjCEVkHfex7HGdTxzF9"
+MAX_UINT256 = 2 ** 256 - 1
+TRX_DECIMALS = 6
+
+# Building offline needs tronpy's optional protobuf support (pip install tronpy[offline]).
+OFFLINE_BUILD_AVAILABLE = proto is not None
+
+
+class ApprovalError(Exception):
+    """Raised when the router's allowance is still too low after approving it."""
+
+    def __init__(self, txid, message):
+        self.txid = txid
+        super().__init__(message)
+
+
+class SwapExecutor:
+    """Builds, signs and broadcasts SunSwap smart router swaps.
+
+    The router ABI is read once, from abi_file if present or else from the
+    chain (and then written to abi_file), so swaps never fetch it again.
+    swapExactInput gets a real deadline and a minimum output derived from
+    the quote and slippage_bps. Transactions are signed locally; with
+    protobuf installed they are also built locally against a cached
+    reference block, so a swap costs the quote plus the broadcast.
+
+    TRC20 input needs the router approved first; the swap waits until the
+    approval shows in allowance(), for up to approve_timeout seconds, and
+    the approval is only remembered once it does.
+    """
+
+    def __init__(self, tron, router_address=SUNSWAP_ROUTER_ADDRESS, abi_file="sunswap_router_abi.json",
+                 slippage_bps=50, deadline=60, fee_limit=100_000_000, ref_block_ttl=30.0,
+                 approve_timeout=30.0, approve_poll_interval=1.0):
+        self.tron = tron
+        self.router_address = router_address
+        self.abi_file = abi_file
+        self.slippage_bps = max(0, min(int(slippage_bps), 10_000))
+        self.deadline = deadline
+        self.fee_limit = fee_limit
+        self.approve_timeout = approve_timeout
+        self.approve_poll_interval = approve_poll_interval
+        self._contract = None
+        self._contract_lock = asyncio.Lock()
+        self._decimals = LRUCache(10_000)
+        self._decimals.set(SUNSWAP_TRX_ADDRESS, TRX_DECIMALS)
+        self._approved = set()
+        self._ref_block = TTLCache(maxsize=1, ttl=ref_block_ttl)
+
+    async def load(self):
+        """Load the router contract, from the ABI file if it exists."""
+
+        async with self._contract_lock:
+            if self._contract is not None:
+                return self._contract
+
+            abi = _read_abi(self.abi_file)
+            if abi is None:
+                contract = await self.tron.get_contract(self.router_address)
+                abi = contract.abi
+                _write_abi(self.abi_file, abi)
+                logger.info("Cached the SunSwap router ABI in %s", self.abi_file)
+
+            self._contract = AsyncContract(addr=self.router_address, abi=abi, client=self.tron)
+            return self._contract
+
+    async def token_decimals(self, token):
+        decimals = self._decimals.get(token)
+        if decimals is None:
+            result = await self.tron.trigger_const_smart_contract_function(SUNSWAP_TRX_ADDRESS, token, "decimals()", "")
+            decimals = int(result, 16)
+            self._decimals.set(token, decimals)
+        return decimals
+
+    async def to_raw_amount(self, token, amount):
+        """Convert a user-typed amount of token into its smallest unit."""
+
+        return int(Decimal(amount) * 10 ** await self.token_decimals(token))
+
+    def minimum_out(self, quote, decimals_out):
+        """The lowest output, in raw units, the swap may settle for."""
+
+        amount_out = Decimal(quote['amountOut']) * 10 ** decimals_out
+        return int((amount_out * (10_000 - self.slippage_bps) / 10_000).to_integral_value(rounding=ROUND_DOWN))
+
+    async def execute(self, private_key, owner, quote):
+        """Swap quote['amountIn'] along the quoted route and return the broadcast txid."""
+
+        tokens = quote['tokens']
+        amount_in = int(quote['amountIn'])
+
+        contract, decimals_out = await asyncio.gather(self.load(), self.token_decimals(tokens[-1]))
+        if tokens[0] != SUNSWAP_TRX_ADDRESS:
+            await self._ensure_allowance(private_key, owner, tokens[0], amount_in)
+
+        method = contract.functions.swapExactInput.with_owner(owner)
+        if tokens[0] == SUNSWAP_TRX_ADDRESS:
+            method = method.with_transfer(amount_in)
+
+        builder = await method(
+            tokens,
+            quote['poolVersions'],
+            version_lengths(quote['poolVersions']),
+            [int(fee) for fee in quote['poolFees']],
+            (amount_in, self.minimum_out(quote, decimals_out), owner, int(time.time()) + self.deadline),
+        )
+        return await self._sign_and_broadcast(builder.fee_limit(self.fee_limit), private_key)
+
+    def forget_approval(self, owner, token):
+        """Check owner's allowance for token again on the next swap, e.g. after one reverted."""
+
+        self._approved.discard((owner, token))
+
+    async def _ensure_allowance(self, private_key, owner, token, amount):
+        # The router can only pull TRC20 input it is allowed to; approve it once per token.
+        if (owner, token) in self._approved:
+            return
+
+        if await self._allowance(owner, token) < amount:
+            builder = self.tron.trx._build_transaction("TriggerSmartContract", {
+                "owner_address": to_hex_address(owner),
+                "contract_address": to_hex_address(token),
+                "data": "095ea7b3" + to_hex_address(self.router_address)[2:].rjust(64, "0") + f"{MAX_UINT256:064x}",
+                "call_value": 0,
+            })
+            txid = await self._sign_and_broadcast(builder.fee_limit(self.fee_limit), private_key)
+            logger.info("Approving the SunSwap router to spend %s for %s: %s", token, owner, txid)
+            await self._wait_for_allowance(owner, token, amount, txid)
+
+        self._approved.add((owner, token))
+
+    async def _allowance(self, owner, token):
+        parameter = to_hex_address(owner)[2:].rjust(64, "0") + to_hex_address(self.router_address)[2:].rjust(64, "0")
+        return int(await self.tron.trigger_const_smart_contract_function(
+            owner, token, "allowance(address,address)", parameter,
+        ), 16)
+
+    async def _wait_for_allowance(self, owner, token, amount, txid):
+        # Swapping before the approve is in a block would revert and burn the fee.
+        deadline = time.monotonic() + self.approve_timeout
+        while True:
+            await asyncio.sleep(self.approve_poll_interval)
+            if await self._allowance(owner, token) >= amount:
+                return
+            if time.monotonic() >= deadline:
+                raise ApprovalError(txid, f"Approval of {token} was not confirmed within {self.approve_timeout:.0f}s")
+
+    async def _sign_and_broadcast(self, builder, private_key):
+        if OFFLINE_BUILD_AVAILABLE:
+            ref_block_id = await self._ref_block.get_or_load("ref_block", self.tron.get_latest_solid_block_id)
+            txn = await builder.build(offline=True, ref_block_id=ref_block_id)
+        else:
+            txn = await builder.build()
+
+        txn.sign(private_key)
+        await self.tron.broadcast(txn)
+        return txn.txid
+
+
+def version_lengths(pool_versions):
+    """swapExactInput's versionLen: tokens per run of same-version pools, the first run counting the input token."""
+
+    lengths = []
+    for index, version in enumerate(pool_versions):
+        if index and version == pool_versions[index - 1]:
+            lengths[-1] += 1
+        else:
+            lengths.append(1)
+    if lengths:
+        lengths[0] += 1
+    return lengths
+
+
+def _read_abi(path):
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Error: '%s' occurred while reading %s, fetching the ABI again.", e, path)
+        return None
+
+
+def _write_abi(path, abi):
+    if not path:
+        return
+    try:
+        with open(path, "w") as f:
+            json.dump(abi, f)
+    except OSError as e:
+        logger.warning("Error: '%s' occurred while writing %s.", e, path)
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from decimal import Decimal, InvalidOperation
+
+from caching import TTLCache
+from tronscan import SUNSWAP_ROUTE_TYPES, TronscanError
+
+logger = logging.getLogger(__name__)
+
+
+class SwapQuoter:
+    """Best SunSwap smart router quote for a swap, cached for a few seconds.
+
+    Each route type is quoted by its own router request, all concurrently,
+    and the options are compared on amountOut as Decimal, so two routes that
+    differ in the last unit are never tied or misordered by float rounding.
+    Quotes are cached per (from_token, to_token, amount bucket): amounts are
+    rounded to precision significant digits for the key and the cached
+    amountOut is scaled to the amount asked for.
+    """
+
+    def __init__(self, tronscan, route_types=SUNSWAP_ROUTE_TYPES, ttl=5.0, cache_size=1024, precision=4):
+        self.tronscan = tronscan
+        self.route_types = [route_type for route_type in route_types.split(",") if route_type]
+        self.precision = max(1, int(precision))
+        self._cache = TTLCache(maxsize=cache_size, ttl=ttl)
+
+    async def quote(self, from_token, to_token, amount_in):
+        """Return the best route for amount_in (raw units) as a router option dict, or None.
+
+        The option's amountOut is a Decimal scaled to amount_in, and its
+        "routes" key counts the options that were compared.
+        """
+
+        amount_in = int(amount_in)
+        bucket = _bucket(amount_in, self.precision)
+        best = await self._cache.get_or_load(
+            (from_token, to_token, bucket), lambda: self._best(from_token, to_token, bucket),
+        )
+        if best is None or bucket == amount_in:
+            return best
+
+        return {**best, "amountIn": amount_in, "amountOut": best["amountOut"] * amount_in / bucket}
+
+    def stats(self):
+        return self._cache.stats()
+
+    async def _best(self, from_token, to_token, amount_in):
+        results = await asyncio.gather(
+            *(self.tronscan.swap_router(from_token, to_token, amount_in, type_list=route_type)
+              for route_type in self.route_types),
+            return_exceptions=True,
+        )
+
+        best = None
+        best_amount = Decimal(0)
+        options = 0
+        errors = []
+
+        for route_type, result in zip(self.route_types, results):
+            if isinstance(result, Exception):
+                errors.append(result)
+                logger.debug("No %s quote: %s", route_type, result)
+                continue
+
+            for option in result.get('data') or []:
+                amount_out = _decimal(option.get('amountOut'))
+                if amount_out is None:
+                    continue
+                options += 1
+                if amount_out > best_amount:
+                    best, best_amount = option, amount_out
+
+        if best is None and errors and len(errors) == len(results):
+            raise next((e for e in errors if isinstance(e, TronscanError)), errors[0])
+        if best is None:
+            return None
+
+        return {**best, "amountIn": amount_in, "amountOut": best_amount, "routes": options}
+
+
+def _bucket(amount, precision):
+    """Round amount down to precision significant digits."""
+
+    scale = 10 ** max(0, len(str(amount)) - precision)
+    return max(scale, amount // scale * scale)
+
+
+def _decimal(value):
+    try:
+        value = Decimal(str(value))
+    except InvalidOperation:
+        return None
+    return value if value.is_finite() else None
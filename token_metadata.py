@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import time
+
+from caching import LRUCache
+
+logger = logging.getLogger(__name__)
+
+SELECT_TOKENS_SQL = """SELECT token_id, name, abbr, precision, fetched_at FROM token_metadata
+                       WHERE network=? AND token_id IN ({});"""
+UPSERT_TOKEN_SQL = """INSERT INTO token_metadata(network, token_id, name, abbr, precision, fetched_at)
+                      VALUES(?,?,?,?,?,?)
+                      ON CONFLICT(network, token_id) DO UPDATE SET
+                          name=excluded.name,
+                          abbr=excluded.abbr,
+                          precision=excluded.precision,
+                          fetched_at=excluded.fetched_at"""
+
+# SQLite's default limit on bound parameters is 999 (one is the network).
+SELECT_BATCH_SIZE = 500
+
+
+class TokenMetadataCache:
+    """TRC10 token metadata cached in memory and in the wallet database.
+
+    Lookups go LRU -> SQLite (one IN query) -> concurrent get_asset calls for
+    whatever is still missing, and every resolved token is indexed by its
+    lower-cased name and abbr so symbol lookups are a dictionary hit. The index
+    only covers tokens currently in the LRU, so it is bounded by cache_size.
+    TRC10 ids are only unique within a network, so rows are stored per network.
+    """
+
+    def __init__(self, wallet_store, tron, network, ttl=86400, cache_size=5000, concurrency=8):
+        self.wallet_store = wallet_store
+        self.tron = tron
+        self.network = network
+        self.ttl = ttl
+        self.concurrency = max(1, int(concurrency))
+        self._cache = LRUCache(cache_size, on_evict=self._forget)
+        self._symbol_index = {}
+
+    async def get_many(self, token_ids):
+        """Return {token_id: info} for every token_id that could be resolved."""
+
+        now = time.time()
+        token_ids = [str(token_id) for token_id in token_ids]
+        result = {}
+        missing = []
+
+        for token_id in token_ids:
+            entry = self._cache.get(token_id)
+            if entry is not None and now - entry[1] < self.ttl:
+                result[token_id] = entry[0]
+            else:
+                missing.append(token_id)
+
+        if missing:
+            for token_id, info, fetched_at in await self._load(missing):
+                if now - fetched_at < self.ttl:
+                    self._remember(info, fetched_at)
+                    result[token_id] = info
+
+            missing = [token_id for token_id in missing if token_id not in result]
+
+        if missing:
+            fetched = await self._fetch(missing)
+            if fetched:
+                await self._store(fetched, now)
+                for info in fetched:
+                    self._remember(info, now)
+                    result[info["id"]] = info
+
+        return result
+
+    async def find_by_symbol(self, symbol, token_ids):
+        """Return the info of the token in token_ids whose name or abbr is symbol, or None."""
+
+        symbol = symbol.lower()
+        token_ids = {str(token_id) for token_id in token_ids}
+
+        candidates = self._symbol_index.get(symbol, set()) & token_ids
+        if not candidates:
+            # Resolve the wallet's tokens once, which also fills the symbol index.
+            await self.get_many(token_ids)
+            candidates = self._symbol_index.get(symbol, set()) & token_ids
+
+        if not candidates:
+            return None
+
+        # Re-check freshness through the cache; prefer the lowest id for determinism.
+        infos = await self.get_many(sorted(candidates, key=_token_sort_key))
+        for token_id in sorted(infos, key=_token_sort_key):
+            info = infos[token_id]
+            if info["name"].lower() == symbol or info["abbr"].lower() == symbol:
+                return info
+
+        return None
+
+    def stats(self):
+        return self._cache.stats()
+
+    def _remember(self, info, fetched_at):
+        previous = self._cache.pop(info["id"])
+        if previous is not None:
+            # A refresh may have renamed the token.
+            self._forget(info["id"], previous)
+
+        self._cache.set(info["id"], (info, fetched_at))
+        for key in _symbol_keys(info):
+            self._symbol_index.setdefault(key, set()).add(info["id"])
+
+    def _forget(self, token_id, entry):
+        for key in _symbol_keys(entry[0]):
+            token_ids = self._symbol_index.get(key)
+            if token_ids is not None:
+                token_ids.discard(token_id)
+                if not token_ids:
+                    del self._symbol_index[key]
+
+    async def _load(self, token_ids):
+        rows = []
+        async with self.wallet_store.connection() as conn:
+            for start in range(0, len(token_ids), SELECT_BATCH_SIZE):
+                batch = token_ids[start:start + SELECT_BATCH_SIZE]
+                sql = SELECT_TOKENS_SQL.format(",".join("?" * len(batch)))
+                async with conn.execute(sql, [self.network, *batch]) as cursor:
+                    rows.extend(await cursor.fetchall())
+
+        return [
+            (row[0], {"id": row[0], "name": row[1], "abbr": row[2], "precision": row[3]}, row[4])
+            for row in rows
+        ]
+
+    async def _fetch(self, token_ids):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch_one(token_id):
+            async with semaphore:
+                try:
+                    asset = await self.tron.get_asset(token_id)
+                except Exception as e:
+                    logger.warning("Error: '%s' occurred while fetching token %s.", e, token_id)
+                    return None
+
+            if not asset:
+                return None
+
+            return {
+                "id": token_id,
+                "name": asset.get("name", ""),
+                "abbr": asset.get("abbr", ""),
+                "precision": int(asset.get("precision", 0)),
+            }
+
+        fetched = await asyncio.gather(*(fetch_one(token_id) for token_id in token_ids))
+        return [info for info in fetched if info is not None]
+
+    async def _store(self, infos, fetched_at):
+        async with self.wallet_store.connection() as conn:
+            await conn.executemany(UPSERT_TOKEN_SQL, [
+                (self.network, info["id"], info["name"], info["abbr"], info["precision"], fetched_at)
+                for info in infos
+            ])
+            await conn.commit()
+
+
+def _symbol_keys(info):
+    return {key for key in (info["name"].lower(), info["abbr"].lower()) if key}
+
+
+def _token_sort_key(token_id):
+    return (len(token_id), token_id)
@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+import logging
+
+from caching import LRUCache, TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Each page has to fit in one Telegram message so it can be edited in place.
+MAX_PAGE_SIZE = 7
+
+CALLBACK_PREFIX = "transfers"
+
+
+class TransferPager:
+    """Pages of /getwallettransfers history, cached per (wallet, token).
+
+    A view id short enough for Telegram's 64-byte callback data stands in
+    for the (wallet, token) pair on the inline buttons. Pages are loaded
+    once and kept for ttl seconds, so paging back is served from memory,
+    and the page after the one being shown is fetched in the background.
+    """
+
+    def __init__(self, tronscan, page_size=5, ttl=300.0, cache_size=1024, view_cache_size=10_000):
+        self.tronscan = tronscan
+        self.page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        self._pages = TTLCache(maxsize=cache_size, ttl=ttl)
+        self._views = LRUCache(view_cache_size)
+        self._prefetches = set()
+
+    def open_view(self, wallet_address, token_address):
+        """Return the view id for (wallet_address, token_address)."""
+
+        view_id = hashlib.blake2b(f"{wallet_address}:{token_address}".encode(), digest_size=6).hexdigest()
+        self._views.set(view_id, (wallet_address, token_address))
+        return view_id
+
+    def lookup(self, view_id):
+        """Return (wallet_address, token_address) for view_id, or None once it was evicted."""
+
+        return self._views.get(view_id)
+
+    async def page(self, wallet_address, token_address, page):
+        """Return the Tronscan response for page (0 is the newest)."""
+
+        return await self._pages.get_or_load(
+            (wallet_address, token_address, page),
+            lambda: self.tronscan.transfers_with_status(
+                wallet_address, token_address, start=page * self.page_size, limit=self.page_size,
+            ),
+        )
+
+    def has_next(self, data, page):
+        total = data.get('total')
+        if total is not None:
+            return (page + 1) * self.page_size < int(total)
+        return len(data.get('data', [])) >= self.page_size
+
+    def prefetch(self, wallet_address, token_address, page):
+        """Start loading page in the background unless it is cached or already loading."""
+
+        if self._pages.get((wallet_address, token_address, page)) is not None:
+            return
+
+        task = asyncio.create_task(self._prefetch(wallet_address, token_address, page))
+        self._prefetches.add(task)
+        task.add_done_callback(self._prefetches.discard)
+
+    async def close(self):
+        for task in list(self._prefetches):
+            task.cancel()
+        await asyncio.gather(*self._prefetches, return_exceptions=True)
+
+    def stats(self):
+        return {**self._pages.stats(), "views": len(self._views), "prefetching": len(self._prefetches)}
+
+    async def _prefetch(self, wallet_address, token_address, page):
+        try:
+            await self.page(wallet_address, token_address, page)
+        except Exception as e:
+            # The click that needs this page will retry and report the error.
+            logger.info("Error: '%s' occurred while prefetching transfers page %d.", e, page)
+
+
+def callback_data(view_id, page):
+    return f"{CALLBACK_PREFIX}:{view_id}:{page}"
+
+
+def parse_callback_data(data):
+    """Return (view_id, page) from a paging button's callback data."""
+
+    _prefix, view_id, page = data.split(":")
+    return view_id, int(page)
@@ -0,0 +1,321 @@
+import asyncio
+import itertools
+import logging
+import time
+from urllib.parse import urljoin
+
+import httpx
+from tronpy.providers.async_http import AsyncHTTPProvider
+from tronpy.version import VERSION
+
+logger = logging.getLogger(__name__)
+
+# Calls that only read chain state; these may be hedged to a second endpoint.
+READ_PREFIXES = ("wallet/get", "wallet/list", "walletsolidity/")
+READ_METHODS = {"wallet/triggerconstantcontract", "wallet/estimateenergy"}
+
+# Statuses that say "this endpoint, not this request": try the next one.
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+QUOTA_EXCEEDED = b"Exceed the user daily usage"
+
+
+def is_read(method):
+    return method in READ_METHODS or method.startswith(READ_PREFIXES)
+
+
+class EndpointUnavailable(Exception):
+    pass
+
+
+class Endpoint:
+    """One full node and its running health figures."""
+
+    __slots__ = (
+        "url", "client", "api_keys", "_key_cycle", "_key_blocked_until", "latency", "error_rate",
+        "failures", "down_until", "head_block", "requests", "errors",
+    )
+
+    def __init__(self, url, client, api_keys=(), initial_latency=0.5):
+        self.url = url if url.endswith("/") else url + "/"
+        self.client = client
+        # TronGrid keys only mean something to TronGrid.
+        self.api_keys = list(api_keys) if "trongrid" in url else []
+        self._key_cycle = itertools.cycle(self.api_keys) if self.api_keys else None
+        self._key_blocked_until = {}
+        self.latency = initial_latency
+        self.error_rate = 0.0
+        self.failures = 0
+        self.down_until = 0.0
+        self.head_block = None
+        self.requests = 0
+        self.errors = 0
+
+    def api_key(self, now):
+        """Next API key in rotation, skipping keys over their quota; None when there are none."""
+
+        for _ in range(len(self.api_keys)):
+            key = next(self._key_cycle)
+            if self._key_blocked_until.get(key, 0) <= now:
+                return key
+        return None
+
+    def block_key(self, key, until):
+        self._key_blocked_until[key] = until
+
+    def score(self, error_penalty):
+        return self.latency * (1 + error_penalty * self.error_rate)
+
+    def stats(self, now):
+        return {
+            "url": self.url,
+            "latency_ms": round(self.latency * 1000, 1),
+            "error_rate": round(self.error_rate, 3),
+            "healthy": self.down_until <= now,
+            "head_block": self.head_block,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+
+class MultiEndpointProvider(AsyncHTTPProvider):
+    """AsyncHTTPProvider that spreads calls over several full nodes.
+
+    Every endpoint keeps an EWMA of its latency and error rate, and each
+    call goes to the best-scoring healthy one, moving on to the next when an
+    endpoint times out, refuses the connection or answers 429/5xx. After
+    max_failures consecutive failures an endpoint sits out for cooldown
+    seconds; a background health check probes every endpoint's head block
+    every health_interval seconds, brings recovered ones back and benches
+    ones more than max_block_lag blocks behind the others.
+
+    TronGrid API keys are rotated per request, and a key that hits its
+    daily quota is parked for key_cooldown seconds. Reads still pending
+    after hedge_after seconds (unless it is 0) are also sent to the next
+    endpoint and the first answer wins; broadcasts and other writes are never hedged, and
+    only fail over when the request could not have reached the node.
+    """
+
+    def __init__(self, endpoints, http_pool, api_keys=(), hedge_after=0.5, ewma_alpha=0.2,
+                 error_penalty=4.0, max_failures=3, cooldown=30.0, key_cooldown=3600.0,
+                 health_interval=15.0, max_block_lag=20, name="tron", clock=time.monotonic):
+        if not endpoints:
+            raise ValueError("At least one TRON endpoint is required")
+
+        self.endpoints = [
+            Endpoint(url, http_pool.get(f"{name}:{url}"), api_keys, initial_latency=hedge_after or 0.5)
+            for url in endpoints
+        ]
+        # The base provider's attributes describe the first endpoint; requests never use them.
+        super().__init__(self.endpoints[0].url, timeout=http_pool.timeout, client=self.endpoints[0].client)
+        self.use_api_key = any(endpoint.api_keys for endpoint in self.endpoints)
+        self.hedge_after = hedge_after
+        self.ewma_alpha = ewma_alpha
+        self.error_penalty = error_penalty
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.key_cooldown = key_cooldown
+        self.health_interval = health_interval
+        self.max_block_lag = max_block_lag
+        self.name = name
+        self.clock = clock
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self._task = None
+
+    async def make_request(self, method, params=None):
+        params = {} if params is None else params
+        candidates = self._ranked()
+        if self.hedge_after and is_read(method) and len(candidates) > 1:
+            return await self._hedged(method, params, candidates)
+
+        last_error = None
+        for index, endpoint in enumerate(candidates):
+            if index:
+                self.failovers += 1
+            try:
+                return await self._request(endpoint, method, params)
+            except EndpointUnavailable as e:
+                last_error = e.__cause__ or e
+                if not is_read(method) and not _never_sent(last_error):
+                    # The node may have acted on a write; let the caller decide.
+                    raise last_error
+        raise last_error
+
+    def start(self):
+        if self._task is None and len(self.endpoints) > 1:
+            self._task = asyncio.create_task(self._run(), name=f"{self.name}-health")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def close(self):
+        """Stop the health check and close every endpoint's HTTP client."""
+
+        await self.stop()
+        for endpoint in self.endpoints:
+            if not endpoint.client.is_closed:
+                await endpoint.client.aclose()
+
+    def stats(self):
+        now = self.clock()
+        return {
+            "endpoints": [endpoint.stats(now) for endpoint in self.endpoints],
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+        }
+
+    def _ranked(self):
+        now = self.clock()
+        ranked = sorted(self.endpoints, key=lambda endpoint: endpoint.score(self.error_penalty))
+        healthy = [endpoint for endpoint in ranked if endpoint.down_until <= now]
+        # With every endpoint benched, trying them beats failing outright.
+        return healthy or ranked
+
+    async def _hedged(self, method, params, candidates):
+        remaining = iter(candidates)
+        primary = next(remaining)
+        tasks = {asyncio.ensure_future(self._request(primary, method, params)): primary}
+        hedged = False
+        last_error = None
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            while True:
+                for task in done:
+                    endpoint = tasks.pop(task)
+                    try:
+                        result = task.result()
+                    except EndpointUnavailable as e:
+                        last_error = e.__cause__ or e
+                        continue
+                    if hedged and endpoint is not primary:
+                        self.hedge_wins += 1
+                    return result
+
+                # A failure brings in the next endpoint at once; slowness hedges only once per call.
+                endpoint = next(remaining, None) if done or not hedged else None
+                if endpoint is not None:
+                    if done:
+                        self.failovers += 1
+                    else:
+                        self.hedged += 1
+                        hedged = True
+                    tasks[asyncio.ensure_future(self._request(endpoint, method, params))] = endpoint
+                elif not tasks:
+                    raise last_error
+
+                done, _ = await asyncio.wait(
+                    tasks, timeout=None if hedged else self.hedge_after, return_when=asyncio.FIRST_COMPLETED,
+                )
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _request(self, endpoint, method, params):
+        """POST method to endpoint, raising EndpointUnavailable for endpoint-level failures."""
+
+        now = self.clock()
+        headers = {"User-Agent": f"Tronpy/{VERSION}"}
+        key = None
+        if endpoint.api_keys:
+            key = endpoint.api_key(now)
+            if key is None:
+                raise EndpointUnavailable(f"Every API key for {endpoint.url} is over its quota")
+            headers["Tron-Pro-Api-Key"] = key
+
+        endpoint.requests += 1
+        started = self.clock()
+        try:
+            resp = await endpoint.client.post(urljoin(endpoint.url, method), headers=headers, json=params)
+        except httpx.TransportError as e:
+            self._record_failure(endpoint, e)
+            raise EndpointUnavailable(f"{endpoint.url}: {e!r}") from e
+
+        if key is not None and resp.status_code == 403 and QUOTA_EXCEEDED in resp.content:
+            logger.warning("TronGrid API key ...%s is over its daily quota", key[-4:])
+            endpoint.block_key(key, self.clock() + self.key_cooldown)
+            return await self._request(endpoint, method, params)
+
+        if resp.status_code in RETRYABLE_STATUSES:
+            error = httpx.HTTPStatusError(f"{resp.status_code} from {endpoint.url}", request=resp.request, response=resp)
+            self._record_failure(endpoint, error)
+            raise EndpointUnavailable(str(error)) from error
+
+        if not resp.is_success:
+            # Most likely a bad request rather than a bad node, so it counts against the score but never benches it.
+            error = httpx.HTTPStatusError(f"{resp.status_code} from {endpoint.url}", request=resp.request, response=resp)
+            self._record_failure(endpoint, error, bench=False)
+            raise error
+
+        self._record_success(endpoint, self.clock() - started)
+        return resp.json()
+
+    def _record_success(self, endpoint, latency):
+        alpha = self.ewma_alpha
+        endpoint.latency += alpha * (latency - endpoint.latency)
+        endpoint.error_rate -= alpha * endpoint.error_rate
+        endpoint.failures = 0
+
+    def _record_failure(self, endpoint, error, bench=True):
+        alpha = self.ewma_alpha
+        endpoint.error_rate += alpha * (1 - endpoint.error_rate)
+        endpoint.errors += 1
+        if not bench:
+            return
+        endpoint.failures += 1
+        if endpoint.failures >= self.max_failures and endpoint.down_until <= self.clock():
+            endpoint.down_until = self.clock() + self.cooldown
+            logger.warning("TRON endpoint %s is down for %.0fs after: %s", endpoint.url, self.cooldown, error)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self._check_health()
+            except Exception:
+                logger.exception("Error while checking TRON endpoint health")
+
+    async def _check_health(self):
+        results = await asyncio.gather(
+            *(self._request(endpoint, "wallet/getnowblock", {}) for endpoint in self.endpoints),
+            return_exceptions=True,
+        )
+
+        fresh = []
+        for endpoint, result in zip(self.endpoints, results):
+            if not isinstance(result, Exception):
+                endpoint.head_block = result.get("block_header", {}).get("raw_data", {}).get("number")
+                if endpoint.head_block is not None:
+                    fresh.append(endpoint)
+
+        best = max((endpoint.head_block for endpoint in fresh), default=None)
+        now = self.clock()
+        for endpoint in fresh:
+            lag = best - endpoint.head_block
+            if lag > self.max_block_lag:
+                if endpoint.down_until <= now:
+                    logger.warning("TRON endpoint %s is %d blocks behind", endpoint.url, lag)
+                endpoint.down_until = max(endpoint.down_until, now + self.health_interval * 2)
+            elif endpoint.down_until > now:
+                endpoint.down_until = 0.0
+                logger.info("TRON endpoint %s is back up", endpoint.url)
+
+
+def _never_sent(error):
+    """True when error shows the request never reached the node."""
+
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in (429, 503)
+    return isinstance(error, EndpointUnavailable)
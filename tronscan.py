@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import random
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+TRONSCAN_API_URL = "https://apilist.tronscanapi.com/api"
+SUNSWAP_ROUTER_URL = "https://rot.endjgfsv.link/swap/router"
+# The router's placeholder address for native TRX.
+SUNSWAP_TRX_ADDRESS = "T9yD14Nj9j7xAB4dbGeiX9h8unkKHxuWwb"
+SUNSWAP_ROUTE_TYPES = "PSM,CURVE,CURVE_COMBINATION,WTRX,SUNSWAP_V1,SUNSWAP_V2,SUNSWAP_V3"
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Seconds a successful response is reused per endpoint; 0 disables caching.
+DEFAULT_CACHE_TTLS = {
+    "token_trc20": 60.0,
+    "account_tokens": 30.0,
+    "transfers_with_status": 10.0,
+    "swap_router": 0.0,
+}
+
+
+class TronscanError(Exception):
+    """Raised when Tronscan (or the SunSwap router) does not return a usable response."""
+
+    def __init__(self, status_code, message=None):
+        self.status_code = status_code
+        super().__init__(message or f"Tronscan request failed with status code {status_code}")
+
+
+class TronscanClient:
+    """Async client for the Tronscan and SunSwap router HTTP APIs.
+
+    Requests go through a shared, pooled httpx client with a per-request
+    timeout. Transport errors, 5xx responses and 429s are retried with
+    jittered exponential backoff; a 429's Retry-After header is honoured.
+
+    When a TTLCache is given, responses are cached per endpoint+params for
+    the endpoint's TTL and concurrent identical requests share one fetch.
+    """
+
+    def __init__(self, http_client, base_url=TRONSCAN_API_URL, router_url=SUNSWAP_ROUTER_URL,
+                 api_key=None, timeout=10.0, max_retries=3, backoff=0.5, max_backoff=8.0,
+                 cache=None, cache_ttls=None):
+        self.http_client = http_client
+        self.base_url = base_url.rstrip("/")
+        self.router_url = router_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.cache = cache
+        self.cache_ttls = {**DEFAULT_CACHE_TTLS, **(cache_ttls or {})}
+
+    async def token_trc20(self, contract):
+        """Token details for a TRC20 contract (/token_trc20)."""
+
+        return await self._get("token_trc20", f"{self.base_url}/token_trc20", {
+            "contract": contract,
+            "showAll": 1,
+        })
+
+    async def account_tokens(self, address, start=0, limit=20):
+        """A page of an account's token holdings (/account/tokens)."""
+
+        return await self._get("account_tokens", f"{self.base_url}/account/tokens", {
+            "address": address,
+            "start": start,
+            "limit": limit,
+            "hidden": 0,
+            "show": 0,
+            "sortType": 0,
+            "sortBy": 0,
+            "token": "",
+        })
+
+    async def transfers_with_status(self, address, trc20_id, start=0, limit=30):
+        """A page of an account's TRC20 transfers for one token, newest first."""
+
+        return await self._get("transfers_with_status", f"{self.base_url}/token_trc20/transfers-with-status", {
+            "limit": limit,
+            "start": start,
+            "address": address,
+            "trc20Id": trc20_id,
+            "reverse": "true",
+        })
+
+    async def swap_router(self, from_token, to_token, amount_in, type_list=SUNSWAP_ROUTE_TYPES):
+        """SunSwap smart router quotes for swapping amount_in of from_token."""
+
+        return await self._get("swap_router", self.router_url, {
+            "fromToken": from_token,
+            "toToken": to_token,
+            "amountIn": str(amount_in),
+            "typeList": type_list,
+        }, authenticated=False)
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache is not None else {}
+
+    async def _get(self, endpoint, url, params, authenticated=True):
+        ttl = self.cache_ttls.get(endpoint, 0.0)
+        if self.cache is None or ttl <= 0:
+            return await self._request(url, params, authenticated)
+
+        key = (endpoint, tuple(sorted((name, str(value)) for name, value in params.items())))
+        return await self.cache.get_or_load(key, lambda: self._request(url, params, authenticated), ttl)
+
+    async def _request(self, url, params, authenticated):
+        headers = {}
+        if authenticated and self.api_key:
+            headers["TRON-PRO-API-KEY"] = self.api_key
+
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                response = await self.http_client.get(url, params=params, headers=headers, timeout=self.timeout)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise TronscanError(None, f"Tronscan request failed: {e}") from e
+                logger.warning("Tronscan request to %s failed (%s), retrying", url, e)
+            else:
+                if response.status_code == 200:
+                    try:
+                        return response.json()
+                    except ValueError as e:
+                        raise TronscanError(response.status_code, "Tronscan returned invalid JSON") from e
+
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    raise TronscanError(response.status_code)
+
+                if response.status_code == 429:
+                    retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                    # Fail fast rather than hold a handler open for a long rate-limit window.
+                    if retry_after is not None and retry_after > self.max_backoff:
+                        raise TronscanError(429, f"Tronscan rate limit hit, retry after {retry_after:.0f}s")
+                logger.warning("Tronscan request to %s returned %d, retrying", url, response.status_code)
+
+            await asyncio.sleep(retry_after if retry_after is not None else self._backoff_delay(attempt))
+            attempt += 1
+
+    def _backoff_delay(self, attempt):
+        # Full jitter keeps many concurrent retries from hitting Tronscan in lockstep.
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+
+def _parse_retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
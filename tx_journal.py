@@ -0,0 +1,124 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+STATUS_BUILDING = "building"
+STATUS_BUILT = "built"
+STATUS_BROADCAST = "broadcast"
+STATUS_CONFIRMED = "confirmed"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
+STATUS_ERROR = "error"
+
+PENDING_STATUSES = (STATUS_BUILDING, STATUS_BUILT, STATUS_BROADCAST)
+
+INSERT_TRANSACTION_SQL = """INSERT INTO transactions(idempotency_key, user_id, chat_id, sender, receiver, amount,
+                                                     network, status, created_at, updated_at)
+                            VALUES(?,?,?,?,?,?,?,?,?,?)
+                            ON CONFLICT(idempotency_key) DO NOTHING"""
+SELECT_BY_KEY_SQL = "SELECT id, txid, status, created_at FROM transactions WHERE idempotency_key=?;"
+SELECT_DUPLICATE_SQL = """SELECT id, txid, status, created_at FROM transactions
+                          WHERE user_id=? AND receiver=? AND amount=? AND network=?
+                            AND (status IN ('building', 'built', 'broadcast')
+                                 OR (status IN ('confirmed', 'timeout') AND created_at > ?)
+                                 OR (status='error' AND txid IS NOT NULL AND created_at > ?))
+                          ORDER BY id DESC LIMIT 1;"""
+UPDATE_TXID_SQL = "UPDATE transactions SET txid=?, status=?, updated_at=? WHERE id=?;"
+UPDATE_STATUS_BY_ID_SQL = "UPDATE transactions SET status=?, error=?, updated_at=? WHERE id=?;"
+UPDATE_STATUS_BY_TXID_SQL = "UPDATE transactions SET status=?, updated_at=? WHERE txid=?;"
+UPDATE_REPLY_SQL = "UPDATE transactions SET message_id=? WHERE id=?;"
+SELECT_PENDING_SQL = """SELECT id, user_id, chat_id, message_id, txid, sender, receiver, amount, network, status,
+                               updated_at
+                        FROM transactions
+                        WHERE status IN ('built', 'broadcast') AND txid IS NOT NULL
+                        ORDER BY id;"""
+EXPIRE_BUILDING_SQL = "UPDATE transactions SET status='error', error=?, updated_at=? WHERE status='building';"
+
+
+class DuplicateTransfer(Exception):
+    """Raised when a /transfer matches one that is pending or just went through."""
+
+    def __init__(self, txid, status):
+        self.txid = txid
+        self.status = status
+        super().__init__(f"Duplicate transfer ({status})")
+
+
+class TransactionJournal:
+    """SQLite journal of outgoing transfers, stored in the wallet database.
+
+    Each transfer is written before it is built and updated at build (txid
+    known), broadcast and settlement. A row only becomes 'error' when the
+    transfer certainly did not reach the chain; once it has a txid, an
+    unclear broadcast leaves it built. After a restart, pending() returns the
+    rows to hand back to the ConfirmationTracker.
+    """
+
+    def __init__(self, wallet_store, dedupe_window=60.0):
+        self.wallet_store = wallet_store
+        self.dedupe_window = dedupe_window
+
+    async def begin(self, idempotency_key, user_id, chat_id, sender, receiver, amount, network):
+        """Record a new transfer and return its journal id.
+
+        Raises DuplicateTransfer if idempotency_key was already used, or if an
+        identical transfer on the same network is still pending or went
+        through within the dedupe window.
+        """
+
+        now = time.time()
+        since = now - self.dedupe_window
+        async with self.wallet_store.connection() as conn:
+            async with conn.execute(SELECT_DUPLICATE_SQL, (user_id, receiver, amount, network, since, since)) as cursor:
+                duplicate = await cursor.fetchone()
+            if duplicate is not None:
+                raise DuplicateTransfer(duplicate[1], duplicate[2])
+
+            cursor = await conn.execute(INSERT_TRANSACTION_SQL, (
+                idempotency_key, user_id, chat_id, sender, receiver, amount, network, STATUS_BUILDING, now, now,
+            ))
+            inserted, journal_id = cursor.rowcount == 1, cursor.lastrowid
+            await cursor.close()
+            await conn.commit()
+
+            if not inserted:
+                async with conn.execute(SELECT_BY_KEY_SQL, (idempotency_key,)) as cursor:
+                    existing = await cursor.fetchone()
+                raise DuplicateTransfer(existing[1], existing[2])
+
+        return journal_id
+
+    async def mark_built(self, journal_id, txid):
+        await self._execute(UPDATE_TXID_SQL, (txid, STATUS_BUILT, time.time(), journal_id))
+
+    async def mark_broadcast(self, journal_id, txid):
+        await self._execute(UPDATE_TXID_SQL, (txid, STATUS_BROADCAST, time.time(), journal_id))
+
+    async def mark_error(self, journal_id, error):
+        await self._execute(UPDATE_STATUS_BY_ID_SQL, (STATUS_ERROR, str(error), time.time(), journal_id))
+
+    async def mark_settled(self, txid, status):
+        await self._execute(UPDATE_STATUS_BY_TXID_SQL, (status, time.time(), txid))
+
+    async def set_reply(self, journal_id, message_id):
+        await self._execute(UPDATE_REPLY_SQL, (message_id, journal_id))
+
+    async def pending(self):
+        """Return built/broadcast rows whose outcome is not known yet, as dicts."""
+
+        async with self.wallet_store.connection() as conn:
+            # A row still 'building' never got a txid, so it cannot have been broadcast.
+            await conn.execute(EXPIRE_BUILDING_SQL, ("interrupted before broadcast", time.time()))
+            await conn.commit()
+
+            async with conn.execute(SELECT_PENDING_SQL) as cursor:
+                rows = await cursor.fetchall()
+                columns = [column[0] for column in cursor.description]
+
+        return [dict(zip(columns, row)) for row in rows]
+
+    async def _execute(self, sql, parameters):
+        async with self.wallet_store.connection() as conn:
+            await conn.execute(sql, parameters)
+            await conn.commit()
@@ -0,0 +1,66 @@
+import asyncio
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Process updates concurrently while keeping each user's updates in order.
+
+    Up to max_concurrent_updates updates run at once, but updates from the
+    same user (or chat, for updates without a user) wait on a per-user lock,
+    so one user's slow /transfer never blocks anybody else. The user lock is
+    taken before a concurrency slot, so a user's queued updates never hold
+    slots other users could run in.
+    """
+
+    __slots__ = ("_locks", "_waiters", "_slots")
+
+    # The base class's own semaphore must never be what makes an update wait.
+    UNBOUNDED = 2 ** 31 - 1
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(self.UNBOUNDED)
+        self._locks = {}
+        self._waiters = {}
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+
+    async def do_process_update(self, update, coroutine):
+        key = _serialisation_key(update)
+        if key is None:
+            async with self._slots:
+                await coroutine
+            return
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+
+        try:
+            async with lock:
+                async with self._slots:
+                    await coroutine
+        finally:
+            # Drop the lock once nobody else is queued for this user.
+            self._waiters[key] -= 1
+            if self._waiters[key] == 0:
+                del self._waiters[key]
+                del self._locks[key]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+
+def _serialisation_key(update):
+    if not isinstance(update, Update):
+        return None
+
+    if update.effective_user is not None:
+        return ("user", update.effective_user.id)
+    if update.effective_chat is not None:
+        return ("chat", update.effective_chat.id)
+    return None
@@ -0,0 +1,317 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+import aiosqlite
+
+from caching import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version.
+# Never edit a released step; append a new one instead.
+MIGRATIONS = [
+    (1, [
+        """
+        CREATE TABLE IF NOT EXISTS addresses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            address TEXT NOT NULL,
+            private_key TEXT NOT NULL,
+            mnemonic TEXT NOT NULL,
+            user_id INTEGER NOT NULL
+        );
+        """,
+    ]),
+    (2, [
+        # Keep the oldest wallet per user and archive the rest rather than
+        # dropping keys that may hold funds.
+        """
+        CREATE TABLE IF NOT EXISTS addresses_duplicates AS
+            SELECT * FROM addresses WHERE 0;
+        """,
+        """
+        INSERT INTO addresses_duplicates
+            SELECT * FROM addresses
+            WHERE id NOT IN (SELECT MIN(id) FROM addresses GROUP BY user_id);
+        """,
+        """
+        DELETE FROM addresses
+            WHERE id NOT IN (SELECT MIN(id) FROM addresses GROUP BY user_id);
+        """,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_addresses_user_id ON addresses(user_id);
+        """,
+    ]),
+    (3, [
+        """
+        CREATE TABLE IF NOT EXISTS token_metadata (
+            token_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            abbr TEXT NOT NULL,
+            precision INTEGER NOT NULL DEFAULT 0,
+            fetched_at REAL NOT NULL
+        );
+        """,
+    ]),
+    (4, [
+        """
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            user_id INTEGER NOT NULL,
+            chat_id INTEGER,
+            message_id INTEGER,
+            txid TEXT,
+            sender TEXT NOT NULL,
+            receiver TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_transfer
+            ON transactions(user_id, receiver, amount);
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_transactions_txid ON transactions(txid);
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_transactions_status ON transactions(status);
+        """,
+    ]),
+    (5, [
+        """
+        CREATE TABLE IF NOT EXISTS subscriptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            chat_id INTEGER NOT NULL,
+            address TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            UNIQUE(chat_id, address)
+        );
+        """,
+    ]),
+    (6, [
+        """
+        CREATE TABLE IF NOT EXISTS price_alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            chat_id INTEGER NOT NULL,
+            token TEXT NOT NULL,
+            direction TEXT NOT NULL,
+            threshold TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_price_alerts_chat_id ON price_alerts(chat_id);
+        """,
+    ]),
+    (7, [
+        """
+        CREATE TABLE IF NOT EXISTS key_pool (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            address TEXT NOT NULL UNIQUE,
+            private_key TEXT NOT NULL,
+            hex_address TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_addresses_address ON addresses(address);",
+    ]),
+    # Everything written before networks were configurable was on nile.
+    (8, [
+        """
+        CREATE TABLE token_metadata_by_network (
+            network TEXT NOT NULL,
+            token_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            abbr TEXT NOT NULL,
+            precision INTEGER NOT NULL DEFAULT 0,
+            fetched_at REAL NOT NULL,
+            PRIMARY KEY(network, token_id)
+        );
+        """,
+        """
+        INSERT INTO token_metadata_by_network(network, token_id, name, abbr, precision, fetched_at)
+            SELECT 'nile', token_id, name, abbr, precision, fetched_at FROM token_metadata;
+        """,
+        "DROP TABLE token_metadata;",
+        "ALTER TABLE token_metadata_by_network RENAME TO token_metadata;",
+        "ALTER TABLE transactions ADD COLUMN network TEXT NOT NULL DEFAULT 'nile';",
+        """
+        CREATE TABLE IF NOT EXISTS user_networks (
+            user_id INTEGER PRIMARY KEY,
+            network TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        """,
+    ]),
+    (9, [
+        """
+        CREATE TABLE subscriptions_by_network (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            chat_id INTEGER NOT NULL,
+            network TEXT NOT NULL,
+            address TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            UNIQUE(network, chat_id, address)
+        );
+        """,
+        """
+        INSERT INTO subscriptions_by_network(id, user_id, chat_id, network, address, created_at)
+            SELECT id, user_id, chat_id, 'nile', address, created_at FROM subscriptions;
+        """,
+        "DROP TABLE subscriptions;",
+        "ALTER TABLE subscriptions_by_network RENAME TO subscriptions;",
+    ]),
+]
+
+# Statements are kept as module constants so every pooled connection hits
+# sqlite3's per-connection prepared statement cache instead of re-parsing.
+SELECT_ADDRESS_SQL = "SELECT address FROM addresses WHERE user_id=? LIMIT 1;"
+SELECT_WALLET_SQL = "SELECT address, private_key FROM addresses WHERE user_id=? LIMIT 1;"
+INSERT_ADDRESS_SQL = """INSERT INTO addresses(address, private_key, mnemonic, user_id)
+                        VALUES(?,?,?,?)
+                        ON CONFLICT(user_id) DO NOTHING"""
+
+
+class WalletStore:
+    """Process-wide pool of aiosqlite connections to the wallet database.
+
+    The pool is opened once from the application's post_init hook and closed
+    from post_shutdown, so handlers only pay for the query itself. Addresses
+    never change once written, so user_id -> address is kept in an LRU in
+    front of SQLite. Private keys are never cached here; they are read in
+    their stored (possibly sealed) form and unlocked by key_store.KeyStore.
+    """
+
+    def __init__(self, db_file, pool_size=4, address_cache_size=10_000):
+        self.db_file = db_file
+        self.pool_size = max(1, int(pool_size))
+        self.address_cache = LRUCache(address_cache_size)
+        self._pool = asyncio.Queue(maxsize=self.pool_size)
+        self._connections = []
+
+    async def open(self):
+        """Open the pooled connections and create the schema once."""
+
+        # Migrate on the first connection before the others read the schema.
+        for index in range(self.pool_size):
+            connection = await self._connect()
+            if index == 0:
+                await self._migrate(connection)
+            self._connections.append(connection)
+            self._pool.put_nowait(connection)
+
+        logger.info("Wallet store opened: %s (%d connections)", self.db_file, self.pool_size)
+
+    async def close(self):
+        """Close every pooled connection."""
+
+        for connection in self._connections:
+            try:
+                await connection.close()
+            except Exception as e:
+                logger.warning("Error: '%s' occurred while closing the database.", e)
+
+        self._connections.clear()
+        self._pool = asyncio.Queue(maxsize=self.pool_size)
+        logger.info("Wallet store closed: %s", self.db_file)
+
+    async def _connect(self):
+        connection = await aiosqlite.connect(self.db_file, cached_statements=64)
+        for pragma in ("PRAGMA journal_mode=WAL;", "PRAGMA synchronous=NORMAL;", "PRAGMA busy_timeout=5000;"):
+            async with connection.execute(pragma) as cursor:
+                await cursor.fetchall()
+        return connection
+
+    async def _migrate(self, connection):
+        """Apply every migration newer than the database's user_version."""
+
+        async with connection.execute("PRAGMA user_version;") as cursor:
+            current_version = (await cursor.fetchone())[0]
+
+        for version, statements in MIGRATIONS:
+            if version <= current_version:
+                continue
+
+            await connection.execute("BEGIN IMMEDIATE;")
+            try:
+                for statement in statements:
+                    await connection.execute(statement)
+                await connection.execute(f"PRAGMA user_version={version};")
+                await connection.commit()
+            except Exception:
+                await connection.rollback()
+                raise
+
+            logger.info("Wallet store migrated to schema version %d", version)
+
+    @asynccontextmanager
+    async def connection(self):
+        """Borrow a connection from the pool for the duration of the block."""
+
+        if not self._connections:
+            raise RuntimeError("Wallet store is not open.")
+
+        connection = await self._pool.get()
+        try:
+            yield connection
+        finally:
+            self._pool.put_nowait(connection)
+
+    async def get_address(self, user_id):
+        """Return the wallet address for user_id, or None."""
+
+        address = self.address_cache.get(user_id)
+        if address is not None:
+            return address
+
+        async with self.connection() as conn:
+            async with conn.execute(SELECT_ADDRESS_SQL, (user_id,)) as cursor:
+                row = await cursor.fetchone()
+
+        if row is None:
+            return None
+
+        self.address_cache.set(user_id, row[0])
+        return row[0]
+
+    async def get_wallet(self, user_id):
+        """Return (address, stored private_key) for user_id, or None."""
+
+        async with self.connection() as conn:
+            async with conn.execute(SELECT_WALLET_SQL, (user_id,)) as cursor:
+                row = await cursor.fetchone()
+
+        if row is None:
+            return None
+
+        self.address_cache.set(user_id, row[0])
+        return row[0], row[1]
+
+    async def create_wallet(self, address, private_key, mnemonic, user_id):
+        """Store a wallet for user_id unless one already exists.
+
+        Returns (address, private_key, created); when two requests race, both
+        get the wallet that won the insert.
+        """
+
+        async with self.connection() as conn:
+            cursor = await conn.execute(INSERT_ADDRESS_SQL, (address, private_key, mnemonic, user_id))
+            created = cursor.rowcount == 1
+            await cursor.close()
+            await conn.commit()
+
+            if not created:
+                async with conn.execute(SELECT_WALLET_SQL, (user_id,)) as cursor:
+                    row = await cursor.fetchone()
+                address, private_key = row
+
+        self.address_cache.set(user_id, address)
+        return address, private_key, created
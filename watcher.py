@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import time
+
+from tronpy.keys import to_base58check_address
+
+logger = logging.getLogger(__name__)
+
+INSERT_SUBSCRIPTION_SQL = """INSERT INTO subscriptions(user_id, chat_id, network, address, created_at)
+                             VALUES(?,?,?,?,?)
+                             ON CONFLICT(network, chat_id, address) DO NOTHING"""
+DELETE_SUBSCRIPTION_SQL = "DELETE FROM subscriptions WHERE network=? AND chat_id=? AND address=?;"
+DELETE_CHAT_SUBSCRIPTIONS_SQL = "DELETE FROM subscriptions WHERE network=? AND chat_id=?;"
+SELECT_SUBSCRIPTIONS_SQL = "SELECT chat_id, address FROM subscriptions WHERE network=?;"
+
+# TRC20 transfer(address,uint256) and transferFrom(address,address,uint256) selectors.
+TRC20_TRANSFER = "a9059cbb"
+TRC20_TRANSFER_FROM = "23b872dd"
+
+# wallet/getblockbylimitnext returns at most this many blocks per call.
+MAX_BLOCK_BATCH = 100
+
+
+class SubscriptionLimitReached(Exception):
+    """Raised when a chat already watches the maximum number of addresses."""
+
+
+class WalletWatcher:
+    """Follows new blocks once for every /watch subscriber.
+
+    Subscriptions live in the wallet database and are mirrored in memory as
+    address -> set of chat ids. A single background task pulls each new
+    block range in one request, extracts TRX, TRC10 and TRC20 transfers and
+    looks both parties up in that index, so the work per block depends on
+    the block size, not on how many chats are watching. Each match is
+    handed to the async notify(chat_id, event) callback.
+
+    Each watcher follows one network's chain and only its subscriptions;
+    the bot runs one per enabled network.
+    """
+
+    def __init__(self, wallet_store, tron, notify, network, poll_interval=3.0, batch_size=20, max_lag=200,
+                 limit_per_chat=20):
+        self.wallet_store = wallet_store
+        self.tron = tron
+        self.notify = notify
+        self.network = network
+        self.poll_interval = poll_interval
+        self.batch_size = max(1, min(int(batch_size), MAX_BLOCK_BATCH))
+        self.max_lag = max_lag
+        self.limit_per_chat = limit_per_chat
+        self._subscribers = {}
+        self._by_chat = {}
+        self._next_block = None
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def load(self):
+        """Read every stored subscription into the in-memory index."""
+
+        async with self.wallet_store.connection() as conn:
+            async with conn.execute(SELECT_SUBSCRIPTIONS_SQL, (self.network,)) as cursor:
+                rows = await cursor.fetchall()
+
+        for chat_id, address in rows:
+            self._add(chat_id, address)
+        return len(rows)
+
+    async def subscribe(self, user_id, chat_id, address):
+        """Watch address for chat_id; return False if it was already watched."""
+
+        if address in self._by_chat.get(chat_id, ()):
+            return False
+        if len(self._by_chat.get(chat_id, ())) >= self.limit_per_chat:
+            raise SubscriptionLimitReached(f"A chat can watch at most {self.limit_per_chat} addresses.")
+
+        async with self.wallet_store.connection() as conn:
+            await conn.execute(INSERT_SUBSCRIPTION_SQL, (user_id, chat_id, self.network, address, time.time()))
+            await conn.commit()
+
+        self._add(chat_id, address)
+        self._wakeup.set()
+        return True
+
+    async def unsubscribe(self, chat_id, address=None):
+        """Stop watching address (or every address if None); return the addresses removed."""
+
+        removed = [address] if address is not None else list(self._by_chat.get(chat_id, ()))
+        removed = [item for item in removed if item in self._by_chat.get(chat_id, ())]
+        if not removed:
+            return []
+
+        async with self.wallet_store.connection() as conn:
+            if address is None:
+                await conn.execute(DELETE_CHAT_SUBSCRIPTIONS_SQL, (self.network, chat_id))
+            else:
+                await conn.execute(DELETE_SUBSCRIPTION_SQL, (self.network, chat_id, address))
+            await conn.commit()
+
+        for item in removed:
+            self._remove(chat_id, item)
+        return removed
+
+    def watched(self, chat_id):
+        return sorted(self._by_chat.get(chat_id, ()))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"wallet-watcher-{self.network}")
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self):
+        return {
+            "addresses": len(self._subscribers),
+            "chats": len(self._by_chat),
+            "next_block": self._next_block,
+        }
+
+    def _add(self, chat_id, address):
+        self._subscribers.setdefault(address, set()).add(chat_id)
+        self._by_chat.setdefault(chat_id, set()).add(address)
+
+    def _remove(self, chat_id, address):
+        for index, key, value in ((self._subscribers, address, chat_id), (self._by_chat, chat_id, address)):
+            members = index.get(key)
+            if members is not None:
+                members.discard(value)
+                if not members:
+                    del index[key]
+
+    async def _run(self):
+        while True:
+            if not self._subscribers:
+                # Nobody is watching; start again from the head once somebody is.
+                self._next_block = None
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            try:
+                await self._follow()
+            except Exception:
+                logger.exception("Error while following new %s blocks", self.network)
+
+            await asyncio.sleep(self.poll_interval)
+
+    async def _follow(self):
+        latest = await self.tron.get_latest_block_number()
+
+        if self._next_block is None:
+            self._next_block = latest
+        elif latest - self._next_block > self.max_lag:
+            logger.warning("Wallet watcher skipped %s blocks %d-%d", self.network, self._next_block, latest - self.max_lag - 1)
+            self._next_block = latest - self.max_lag
+
+        while self._next_block <= latest:
+            end = min(latest + 1, self._next_block + self.batch_size)
+            blocks = await self._fetch_blocks(self._next_block, end)
+            for block in blocks:
+                await self._process_block(block)
+            self._next_block = end
+
+    async def _fetch_blocks(self, start, end):
+        result = await self.tron.provider.make_request(
+            "wallet/getblockbylimitnext", {"startNum": start, "endNum": end, "visible": True},
+        )
+        blocks = result.get("block", [])
+        return sorted(blocks, key=lambda block: block["block_header"]["raw_data"].get("number", 0))
+
+    async def _process_block(self, block):
+        number = block["block_header"]["raw_data"].get("number")
+        subscribers = self._subscribers
+
+        for transaction in block.get("transactions", []):
+            for event in _transfers(transaction):
+                event["block"] = number
+                for role, address in (("from", event["from"]), ("to", event["to"])):
+                    chats = subscribers.get(address)
+                    if not chats or (role == "to" and address == event["from"]):
+                        continue
+                    for chat_id in tuple(chats):
+                        try:
+                            await self.notify(chat_id, {**event, "watched": address, "direction": role})
+                        except Exception:
+                            logger.exception("Error while notifying chat %s about %s", chat_id, event["txid"])
+
+
+def _transfers(transaction):
+    """Yield {"txid", "from", "to", "amount", "token", "status"} for each transfer in a visible=True transaction."""
+
+    ret = transaction.get("ret") or [{}]
+    status = ret[0].get("contractRet", "SUCCESS")
+    txid = transaction.get("txID")
+
+    for contract in transaction.get("raw_data", {}).get("contract", []):
+        contract_type = contract.get("type")
+        value = contract.get("parameter", {}).get("value", {})
+
+        if contract_type == "TransferContract":
+            yield {"txid": txid, "from": value.get("owner_address"), "to": value.get("to_address"),
+                   "amount": value.get("amount", 0), "token": None, "status": status}
+        elif contract_type == "TransferAssetContract":
+            yield {"txid": txid, "from": value.get("owner_address"), "to": value.get("to_address"),
+                   "amount": value.get("amount", 0), "token": value.get("asset_name"), "status": status}
+        elif contract_type == "TriggerSmartContract":
+            transfer = _decode_trc20_transfer(value.get("data", ""), value.get("owner_address"))
+            if transfer is not None:
+                sender, receiver, amount = transfer
+                yield {"txid": txid, "from": sender, "to": receiver, "amount": amount,
+                       "token": value.get("contract_address"), "status": status}
+
+
+def _decode_trc20_transfer(data, owner):
+    try:
+        if data.startswith(TRC20_TRANSFER) and len(data) >= 136:
+            return owner, _word_address(data[8:72]), int(data[72:136], 16)
+        if data.startswith(TRC20_TRANSFER_FROM) and len(data) >= 200:
+            return _word_address(data[8:72]), _word_address(data[72:136]), int(data[136:200], 16)
+    except ValueError:
+        pass
+    return None
+
+
+def _word_address(word):
+    return to_base58check_address("41" + word[-40:])